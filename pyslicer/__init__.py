@@ -2,3 +2,12 @@
 # -*- coding: utf-8 -*-
 
 from .client import SlicingDice
+from .sync_client import SyncSlicingDice
+from .core.cache import ResultCache
+from .core.hedging import HedgePolicy
+from .core.instrumentation import Instrumentation, MetricsAggregator
+from .core.rate_limiter import RateLimiter
+from .core.retry import RetryPolicy
+from .core.schema import SchemaCache
+from .core.transport import (
+    AiohttpTransport, FakeTransport, HTTPXTransport, PoolConfig, Transport)
@@ -1,10 +1,34 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import asyncio
+import copy
 import os
+import ssl
+import time
+from types import MappingProxyType
+
+import ujson
 
 from . import exceptions
+from .core.cache import ResultCache, bypasses_cache
+from .core.helper_handler_exceptions import raise_for_errors
+from .core.instrumentation import RequestEvent, route_of
 from .core.requester import Requester
+from .core.retry import RetryPolicy
+from .core.single_flight import SingleFlight
+from .core.transport import PoolConfig
+from .results import Result
+
+RESULT_MODES = ('text', 'bytes', 'object')
+
+# Key levels needed by the operations: 0 read, 1 write and 2 admin
+KEY_LEVELS = (0, 1, 2)
+
+# Content types whose headers are built when the client is created
+CONTENT_TYPES = ('application/json', 'application/sql')
+
+ACCEPT_ENCODING = 'gzip, deflate'
 
 
 class SlicingDiceAPI(object):
@@ -16,7 +40,11 @@ class SlicingDiceAPI(object):
 
     def __init__(
             self, master_key=None, write_key=None, read_key=None,
-            custom_key=None, use_ssl=True, timeout=60):
+            custom_key=None, use_ssl=True, timeout=60, pool=None,
+            concurrency=10, retry=None, rate_limiter=None, compression=None,
+            compression_threshold=1024, result_mode='text', cache=None,
+            coalesce_reads=True, instrumentation=None, lane_limits=None,
+            transport=None, hedge=None):
         """Instantiate a new SlicerDicer object.
 
         Keyword arguments:
@@ -25,11 +53,87 @@ class SlicingDiceAPI(object):
             HTTPS requests. Defaults False.(Optional)
         timeout(int) -- Define timeout to request,
             defaults 60 secs(Optional).
+        pool(PoolConfig) -- Connection pool settings of each key level,
+            defaults to PoolConfig() (Optional)
+        concurrency(int) -- Maximum number of requests sent at once by
+            bulk operations, defaults 10 (Optional)
+        retry(RetryPolicy) -- Retry settings for transient failures,
+            defaults to RetryPolicy() (Optional)
+        rate_limiter(RateLimiter) -- Limit of requests and bytes sent per
+            second, defaults None (Optional)
+        compression(string) -- Content encoding of request bodies, 'gzip'
+            or 'deflate', defaults None (Optional)
+        compression_threshold(int) -- Minimum body size, in bytes, to be
+            compressed, defaults 1024 (Optional)
+        result_mode(string) -- What methods return: 'text' for the body
+            as a string, 'bytes' for the raw body or 'object' for a result
+            object decoded on first access, defaults 'text' (Optional)
+        cache(ResultCache) -- Cache for query results, defaults None
+            (Optional)
+        coalesce_reads(bool) -- Share one request between identical
+            queries in flight at the same time, defaults True (Optional)
+        instrumentation(Instrumentation) -- Receives a RequestEvent with
+            the timings and outcome of every call, defaults None (Optional)
+        lane_limits(dict) -- Maximum concurrent requests of each key level,
+            e.g. {1: 8}, levels without a limit aren't bounded, defaults
+            None (Optional)
+        transport(Transport) -- Sends the requests of every key level and
+            is closed by close(), defaults to an AiohttpTransport per key
+            level (Optional)
+        hedge(HedgePolicy) -- Send slow idempotent reads a second time,
+            defaults None (Optional)
         """
+        if result_mode not in RESULT_MODES:
+            raise ValueError("Invalid result mode: {}".format(result_mode))
         self.keys = self._organize_keys(
             master_key, custom_key, read_key, write_key)
-        self._api_key = self._get_key()[0]
-        self._requester = Requester(use_ssl, timeout)
+        # Raises when no key was informed
+        self._get_key()
+        self._level_keys = self._resolve_keys(self.keys)
+        # Unless a transport is informed, each key level has its own
+        # session and connection pool, so a level using all of its
+        # connections doesn't delay the others. They share one TLS context.
+        if transport is None and use_ssl:
+            pool = copy.copy(pool or PoolConfig())
+            if pool.ssl_context is None:
+                pool.ssl_context = ssl.create_default_context()
+        self._requesters = {
+            level: Requester(use_ssl, timeout, pool, compression,
+                             compression_threshold,
+                             trace=instrumentation is not None,
+                             transport=transport)
+            for level in KEY_LEVELS}
+        self._headers = {}
+        for level in KEY_LEVELS:
+            if self._level_keys[level] is not None:
+                for content_type in CONTENT_TYPES:
+                    for encoding in (None, compression):
+                        self._build_headers(level, content_type, encoding)
+        self._lane_limits = dict(lane_limits or {})
+        for level, limit in self._lane_limits.items():
+            if level not in KEY_LEVELS or limit < 1:
+                raise ValueError("Invalid lane limit: {}: {}".format(
+                    level, limit))
+        self._lanes = {}
+        self.concurrency = concurrency
+        self._retry_policy = retry or RetryPolicy()
+        self._rate_limiter = rate_limiter
+        self.result_mode = result_mode
+        self._cache = cache
+        self._single_flight = SingleFlight() if coalesce_reads else None
+        self._instrumentation = instrumentation
+        self._hedge = hedge
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def close(self):
+        """Close the HTTP sessions and release every pooled connection"""
+        for requester in self._requesters.values():
+            await requester.close()
 
     @staticmethod
     def _organize_keys(master_key, custom_key, read_key, write_key):
@@ -51,23 +155,107 @@ class SlicingDiceAPI(object):
             return [self.keys["read_key"], 0]
         raise exceptions.InvalidSlicingDiceKeysException("You need put a key.")
 
+    @staticmethod
+    def _resolve_keys(keys):
+        """Returns the key sent for each key level: the key of that level
+        or, when it wasn't informed, the master or custom key. Levels no
+        informed key can perform map to None.
+
+        Keyword arguments:
+        keys(dict) -- The keys, as returned by _organize_keys
+        """
+        admin_key = keys["master_key"]
+        if admin_key is None:
+            admin_key = keys["custom_key"]
+        level_keys = {0: keys["read_key"], 1: keys["write_key"], 2: admin_key}
+        for level in (0, 1):
+            if level_keys[level] is None:
+                level_keys[level] = admin_key
+        return level_keys
+
     def _check_key(self, key_level):
-        """Select automatically a key to make the request in Slicing Dice
+        """Select automatically a key to make the request in Slicing Dice.
+        Returns the lowest level key able to perform the operation.
 
         Keyword arguments:
         key_level(int) -- Define the key level needed
         """
-        current_key_level = self._get_key()
-        if current_key_level[1] == 2:
-            return current_key_level[0]
-        if current_key_level[1] != key_level:
+        key = self._level_keys.get(key_level)
+        if key is None:
             raise exceptions.InvalidSlicingDiceKeysException(
                 "This key is not allowed to perform this operation.")
-        return current_key_level[0]
+        return key
+
+    def _build_headers(self, key_level, content_type, encoding):
+        """Returns the read-only request headers of a key level, content
+        type and content encoding, built once and reused by every request
+
+        Keyword arguments:
+        key_level(int) -- Define the key level needed
+        content_type(string) -- The content_type to use in the request
+        encoding(string) -- The body content encoding, None when it isn't
+            compressed
+        """
+        headers = {'Content-Type': content_type,
+                   'Authorization': self._check_key(key_level),
+                   'Accept-Encoding': ACCEPT_ENCODING}
+        if encoding is not None:
+            headers['Content-Encoding'] = encoding
+        headers = self._headers[(key_level, content_type, encoding)] = (
+            MappingProxyType(headers))
+        return headers
+
+    def _lane(self, key_level):
+        """Returns the semaphore bounding the requests of a key level, None
+        when the level has no limit. It is created on first use, inside
+        the running loop."""
+        lane = self._lanes.get(key_level)
+        if lane is None:
+            limit = self._lane_limits.get(key_level)
+            if limit is None:
+                return None
+            lane = self._lanes[key_level] = asyncio.Semaphore(limit)
+        return lane
+
+    def _build_result(self, body, result_class=Result):
+        """Returns a response body in the client result mode
+
+        Keyword arguments:
+        body(bytes) -- The response body
+        result_class(type) -- Result class used in 'object' mode
+        """
+        if self.result_mode == 'text':
+            return body.decode('utf-8')
+        elif self.result_mode == 'bytes':
+            return body
+        return result_class(body)
+
+    @staticmethod
+    def _load_result(response):
+        """Decode a response returned in any result mode
+
+        Keyword arguments:
+        response(str, bytes or Result) -- The response
+        """
+        if isinstance(response, Result):
+            return response.json
+        return ujson.loads(response)
+
+    def _new_event(self):
+        """Returns a RequestEvent for a call, None without instrumentation"""
+        if self._instrumentation is None:
+            return None
+        return RequestEvent()
 
     async def _make_request(self, url, req_type, key_level, json_data=None,
-                            string_data=None, content_type='application/json'):
-        """Returns a object request result
+                            string_data=None, content_type='application/json',
+                            result_class=Result, cache_query=None,
+                            invalidate_cache=False, idempotent=False,
+                            event=None):
+        """Returns a object request result. Raises the exception mapped to
+        the API error when the request fails, retrying transient failures
+        according to the retry policy. Cacheable requests are served from
+        the result cache and identical ones in flight share one request.
 
         Keyword arguments:
         url(string) -- the url to make a request
@@ -76,36 +264,246 @@ class SlicingDiceAPI(object):
         json_data(json) -- The json to use on request (default None)
         content_type(string) -- The content_type to use in the request (default
          'application/json')
+        result_class(type) -- Result class returned in 'object' result mode
+        cache_query(dict) -- The query the result is cached and coalesced
+            for, None when the request isn't a cacheable read
+            (default None)
+        invalidate_cache(bool) -- Clear the result cache once the request
+            changes data (default False)
+        idempotent(bool) -- The request only reads data, so it can be
+            hedged (default False)
+        event(RequestEvent) -- The event of the call, holding the
+            validation and serialization times (default None)
         """
-        self._check_key(key_level)
-        headers = {'Content-Type': content_type,
-                   'Authorization': self._api_key}
+        arguments = (url, req_type, key_level, json_data, string_data,
+                     content_type, result_class, cache_query,
+                     invalidate_cache, idempotent)
+        if self._instrumentation is None:
+            return await self._perform(*arguments, event=None)
+
+        if event is None:
+            event = RequestEvent()
+        event.route = route_of(url[len(self.BASE_URL):])
+        event.method = req_type.upper()
+        event.key_level = key_level
+        # Validation and encoding happen before the call is timed here,
+        # compression is timed within it
+        before = event.validation + event.serialization
+        started = time.perf_counter()
+        try:
+            return await self._perform(*arguments, event=event)
+        except BaseException as e:
+            event.error = type(e).__name__
+            raise
+        finally:
+            event.total = time.perf_counter() - started + before
+            self._instrumentation.on_request(event)
+
+    async def _perform(self, url, req_type, key_level, json_data,
+                       string_data, content_type, result_class, cache_query,
+                       invalidate_cache, idempotent, event):
+        """Serve a request from the cache or send it, see _make_request"""
+        read_key = None
+        if cache_query is not None and (
+                self._cache is not None or self._single_flight is not None):
+            read_key = ResultCache.make_key(url, key_level, cache_query)
+            bypass = bypasses_cache(cache_query)
+            if self._cache is not None:
+                generation = self._cache.generation
+                if not bypass:
+                    cached = self._cache.get(read_key)
+                    if cached is not None:
+                        if event is not None:
+                            event.cache_hit = True
+                        return self._decode(cached, result_class, event)
 
+        def fetch():
+            return self._fetch(url, req_type, key_level, json_data,
+                               string_data, content_type, event, idempotent)
+
+        if (read_key is not None and self._single_flight is not None and
+                not bypass):
+            if event is not None and read_key in self._single_flight:
+                event.coalesced = True
+            result = await self._single_flight.do(read_key, fetch)
+        else:
+            result = await fetch()
+
+        if self._cache is not None:
+            if read_key is not None:
+                self._cache.put(read_key, url, result, generation)
+            elif invalidate_cache:
+                self._cache.clear()
+        return self._decode(result, result_class, event)
+
+    def _decode(self, body, result_class, event):
+        """Returns _build_result, timed in the event decoding phase"""
+        if event is None:
+            return self._build_result(body, result_class)
+        started = time.perf_counter()
+        result = self._build_result(body, result_class)
+        event.decoding += time.perf_counter() - started
+        return result
+
+    async def _fetch(self, url, req_type, key_level, json_data, string_data,
+                     content_type, event=None, idempotent=False):
+        """Send a request, retrying transient failures. Returns the
+        response body.
+
+        Keyword arguments:
+        url(string) -- the url to make a request
+        req_type(string) -- the request type (POST, PUT, DELETE or GET)
+        key_level(int) -- Define the key level needed
+        json_data(json) -- The json to use on request
+        string_data(string) -- The body used when json_data is None
+        content_type(string) -- The content_type to use in the request
+        event(RequestEvent) -- Receives the timings, when given
+        idempotent(bool) -- Hedge the request when the client has a hedge
+            policy and retry it after any transient error, GET requests
+            are always retried (default False)
+        """
+        self._check_key(key_level)
+        requester = self._requesters[key_level]
         data = json_data
         if string_data is not None and json_data is None:
             data = string_data
-        req = None
-
-        if req_type == "post":
-            req = self._requester.post(
-                url,
-                data=data,
-                headers=headers)
-        elif req_type == "get":
-            req = self._requester.get(
-                url,
-                headers=headers)
-
-        elif req_type == "delete":
-            req = self._requester.delete(
-                url,
-                headers=headers)
-
-        elif req_type == "put":
-            req = self._requester.put(
-                url,
-                data=data,
-                headers=headers)
-
-        status, result = await req
-        return result
+        if event is not None:
+            started = time.perf_counter()
+        data, encoding = requester.prepare_body(data)
+        if event is not None:
+            event.serialization += time.perf_counter() - started
+        headers = self._headers.get((key_level, content_type, encoding))
+        if headers is None:
+            headers = self._build_headers(key_level, content_type, encoding)
+        lane = self._lane(key_level)
+        hedge = self._hedge if idempotent else None
+
+        self._retry_policy.on_request()
+        attempt = 0
+        while True:
+            if self._rate_limiter is not None:
+                if event is not None:
+                    started = time.perf_counter()
+                await self._rate_limiter.acquire(
+                    key_level, len(data) if data else 0)
+                if event is not None:
+                    event.queue += time.perf_counter() - started
+            try:
+                if hedge is None:
+                    status, result = await self._attempt(
+                        lane, url, req_type, data, headers, event, key_level)
+                else:
+                    status, result = await self._send_hedged(
+                        hedge, lane, url, req_type, data, headers, event,
+                        key_level)
+                if event is None:
+                    raise_for_errors(status, result)
+                else:
+                    started = time.perf_counter()
+                    try:
+                        raise_for_errors(status, result)
+                    finally:
+                        event.decoding += time.perf_counter() - started
+                return result
+            except exceptions.SlicingDiceException as e:
+                if not self._retry_policy.should_retry(
+                        e, attempt, idempotent or req_type.lower() == 'get'):
+                    raise
+            delay = self._retry_policy.backoff(attempt)
+            await asyncio.sleep(delay)
+            attempt += 1
+            if event is not None:
+                event.retries = attempt
+                event.backoff += delay
+
+    def _attempt(self, lane, url, req_type, data, headers, event,
+                 key_level):
+        """Returns the coroutine sending a request, in its key level lane
+        when it has one, see _send"""
+        if lane is None:
+            return self._send(url, req_type, data, headers, event, key_level)
+        return self._send_in_lane(lane, url, req_type, data, headers, event,
+                                  key_level)
+
+    async def _send_hedged(self, hedge, lane, url, req_type, data, headers,
+                           event, key_level):
+        """Send a read and, when it doesn't answer within the hedge delay
+        and the hedge budget allows, an identical one. Returns the first
+        response, cancelling the other request. The hedge is rate limited
+        but isn't timed in the event."""
+        hedge.on_request()
+        delay = hedge.delay(url)
+        started = {}
+
+        async def attempt(hedged):
+            if hedged and self._rate_limiter is not None:
+                await self._rate_limiter.acquire(
+                    key_level, len(data) if data else 0)
+            started[hedged] = time.perf_counter()
+            return await self._attempt(lane, url, req_type, data, headers,
+                                       None if hedged else event, key_level)
+
+        first = asyncio.ensure_future(attempt(False))
+        attempts = [first]
+        try:
+            if delay is not None:
+                await asyncio.wait(attempts, timeout=delay)
+                if not first.done() and hedge.should_hedge():
+                    attempts.append(asyncio.ensure_future(attempt(True)))
+                    if event is not None:
+                        event.hedged = True
+            pending = list(attempts)
+            while True:
+                done, _ = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED)
+                winner = first if first in done else done.pop()
+                pending.remove(winner)
+                # A failed request loses, unless no other one is left
+                if winner.exception() is None or not pending:
+                    break
+            status, body = winner.result()
+        finally:
+            for task in attempts:
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled():
+                    # Mark the exceptions of losing requests as retrieved
+                    task.exception()
+
+        now = time.perf_counter()
+        hedge_won = winner is not first
+        if status < 500:
+            hedge.record(url, now - started[hedge_won], hedge_won)
+            if hedge_won:
+                # The first request took at least this long
+                hedge.record(url, now - started[False])
+        if hedge_won and event is not None:
+            event.status = status
+            event.bytes_received += len(body)
+        return status, body
+
+    async def _send_in_lane(self, lane, url, req_type, data, headers,
+                            event, key_level):
+        """Send a request once the key level lane has room for it, see
+        _send. The time waiting for the lane is the event queue phase."""
+        if event is not None:
+            started = time.perf_counter()
+        async with lane:
+            if event is not None:
+                event.queue += time.perf_counter() - started
+            return await self._send(url, req_type, data, headers, event,
+                                    key_level)
+
+    def _send(self, url, req_type, data, headers, event=None, key_level=2):
+        """Returns the requester coroutine for a request type
+
+        Keyword arguments:
+        url(string) -- the url to make a request
+        req_type(string) -- the request type (POST, PUT, DELETE or GET)
+        data(string or bytes) -- The request body, None for GET and DELETE
+        headers(Mapping) -- The request headers
+        event(RequestEvent) -- Receives the timings, when given
+        key_level(int) -- The key level whose connection pool is used
+        """
+        return self._requesters[key_level].request(
+            req_type.upper(), url, headers, data, event)
@@ -16,12 +16,21 @@
 # limitations under the License.
 
 """A library that provides a Python client to Slicing Dice API"""
+import asyncio
+import time
+
 import ujson
 
 from . import exceptions
 from .api import SlicingDiceAPI
+from .core.deadline import deadline_from, wait_until, with_deadline
+from .results import (AggregationResult, CountResult, DataExtractionResult,
+                      TopValuesResult)
 from .url_resources import URLResources
 from .utils import validators
+from .utils.concurrency import bounded_map
+from .utils.data_utils import (chunk_insertion, is_encoded, read_records,
+                               split_queries)
 
 
 class SlicingDice(SlicingDiceAPI):
@@ -82,7 +91,12 @@ class SlicingDice(SlicingDiceAPI):
 
     def __init__(
             self, write_key=None, read_key=None, master_key=None,
-            custom_key=None, use_ssl=True, timeout=60):
+            custom_key=None, use_ssl=True, timeout=60, pool=None,
+            concurrency=10, retry=None, rate_limiter=None, compression=None,
+            compression_threshold=1024, result_mode='text', cache=None,
+            coalesce_reads=True, validation=validators.VALIDATION_FULL,
+            schema=None, instrumentation=None, lane_limits=None,
+            transport=None, hedge=None):
         """Instantiate a new SlicingDice object.
 
         Keyword arguments:
@@ -91,24 +105,175 @@ class SlicingDice(SlicingDiceAPI):
             HTTPS requests. Defaults False.(Optional)
         timeout(int) -- Define timeout to request,
             defaults 60 secs(default 30).
+        pool(PoolConfig) -- Connection pool settings of each key level
+            (total and per host limits, keep-alive, DNS cache TTL and TLS
+            context).(Optional)
+        concurrency(int) -- Maximum number of requests sent at once by
+            bulk operations, defaults 10.(Optional)
+        retry(RetryPolicy) -- Retries of rate limited, 5xx, connection and
+            timeout failures with exponential backoff.(Optional)
+        rate_limiter(RateLimiter) -- Requests and bytes per second allowed
+            for each key level, shared by every coroutine.(Optional)
+        compression(string) -- Compress request bodies with 'gzip' or
+            'deflate'.(Optional)
+        compression_threshold(int) -- Minimum body size, in bytes, to be
+            compressed, defaults 1024.(Optional)
+        result_mode(string) -- 'text' returns the response as a string,
+            'bytes' as received and 'object' as a result object from
+            pyslicer.results, defaults 'text'.(Optional)
+        cache(ResultCache) -- Cache for count, top values and aggregation
+            results, cleared by insert, update and delete.(Optional)
+        coalesce_reads(bool) -- Identical count, top values and aggregation
+            queries in flight at the same time share one request, defaults
+            True.(Optional)
+        validation(string) -- Client side validation of inserts and
+            queries: 'full' checks every nested value, 'structural' only
+            the request shape and API limits and 'off' sends requests as
+            they are, defaults 'full'.(Optional)
+        schema(SchemaCache) -- Column types loaded with get_columns to
+            reject or coerce insert values of the wrong type and unknown
+            columns before sending them.(Optional)
+        instrumentation(Instrumentation) -- Receives a RequestEvent with
+            the time spent in each phase, the sizes, status and retries of
+            every call, e.g. a MetricsAggregator.(Optional)
+        lane_limits(dict) -- Maximum requests in flight for each key level,
+            e.g. {1: 8} so bulk inserts never use more than 8 connections,
+            defaults None.(Optional)
+        transport(Transport) -- Sends every request instead of an aiohttp
+            session per key level, e.g. HTTPXTransport() to multiplex
+            requests over HTTP/2 or FakeTransport() in tests.(Optional)
+        hedge(HedgePolicy) -- Send count, top values, aggregation, exists
+            and SQL SELECT queries again when they take longer than a
+            percentile of the recent response times.(Optional)
         """
+        if validation not in validators.VALIDATION_LEVELS:
+            raise ValueError("Invalid validation level: {}".format(
+                validation))
         super(SlicingDice, self).__init__(
-            master_key, write_key, read_key, custom_key, use_ssl, timeout)
+            master_key, write_key, read_key, custom_key, use_ssl, timeout,
+            pool=pool, concurrency=concurrency, retry=retry,
+            rate_limiter=rate_limiter, compression=compression,
+            compression_threshold=compression_threshold,
+            result_mode=result_mode, cache=cache,
+            coalesce_reads=coalesce_reads, instrumentation=instrumentation,
+            lane_limits=lane_limits, transport=transport, hedge=hedge)
+        self.validation = validation
+        self._schema = schema
+
+    def _validate(self, validator_class, data, openers=b'{', event=None):
+        """Validate data with the client validation level. Returns true
+        when the request can be sent. Pre-encoded payloads are only checked
+        to hold a non empty JSON object or array.
 
-    async def _count_query_wrapper(self, url, query):
+        Keyword arguments:
+        validator_class(type) -- The validator for the request, None when
+            only pre-encoded payloads are checked
+        data(dict or bytes) -- The query or insertion
+        openers(bytes) -- Characters a pre-encoded payload may start with
+            (default b'{')
+        event(RequestEvent) -- Receives the validation time (default None)
+        """
+        started = time.perf_counter()
+        try:
+            if self.validation == validators.VALIDATION_OFF:
+                return True
+            if is_encoded(data):
+                validators.check_encoded(data, openers)
+                return True
+            if validator_class is None:
+                return True
+            return validator_class(data, self.validation).validator()
+        finally:
+            if event is not None:
+                event.validation += time.perf_counter() - started
+
+    async def _check_schema(self, data, event=None):
+        """Check an insertion against the cached column types, loading
+        them first when expired.
+
+        Keyword arguments:
+        data(dict) -- The insertion
+        event(RequestEvent) -- Receives the validation time (default None)
+        """
+        async def load_columns():
+            return self._load_result(await self.get_columns())
+
+        await self._schema.refresh(load_columns)
+        started = time.perf_counter()
+        try:
+            self._schema.check(data)
+        finally:
+            if event is not None:
+                event.validation += time.perf_counter() - started
+
+    @staticmethod
+    def _encode(data, event=None):
+        """Returns the JSON request body of data, pre-encoded payloads are
+        returned as they are
+
+        Keyword arguments:
+        data(dict, list or bytes) -- The query or insertion
+        event(RequestEvent) -- Receives the serialization time
+            (default None)
+        """
+        if is_encoded(data):
+            return data
+        if event is None:
+            return ujson.dumps(data)
+        started = time.perf_counter()
+        body = ujson.dumps(data)
+        event.serialization += time.perf_counter() - started
+        return body
+
+    async def _count_query_wrapper(self, url, query, split=False):
         """Validate count query and make request.
 
         Keyword arguments:
         url(string) -- Url to make request
         query(dict) -- A count query
+        split(bool) -- Send requests with more queries than the API limit
+            as concurrent requests within the limit (default False)
         """
-        sd_count_query = validators.QueryCountValidator(query)
-        if sd_count_query.validator():
+        if split and not is_encoded(query):
+            requests = split_queries(query, validators.MAX_QUERY_SIZE)
+            if len(requests) > 1:
+                responses = await bounded_map(
+                    lambda request: self._count_query_wrapper(url, request),
+                    requests, self.concurrency)
+                return self._merge_query_results(responses, CountResult)
+        event = self._new_event()
+        if self._validate(validators.QueryCountValidator, query, b'{[',
+                          event):
             return await self._make_request(
                 url=url,
-                json_data=ujson.dumps(query),
+                json_data=self._encode(query, event),
                 req_type="post",
-                key_level=0)
+                key_level=0,
+                result_class=CountResult,
+                cache_query=query,
+                idempotent=True,
+                event=event)
+
+    def _merge_query_results(self, responses, result_class):
+        """Merge the responses of a split query into one response, as if a
+        single request was made.
+
+        Keyword arguments:
+        responses(list) -- The responses of each request
+        result_class(type) -- Result class returned in 'object' result mode
+        """
+        merged = {}
+        took = 0
+        for response in responses:
+            decoded = self._load_result(response)
+            merged.update(decoded['result'])
+            took = max(took, decoded.get('took') or 0)
+        body = ujson.dumps({
+            'status': 'success',
+            'result': merged,
+            'took': took
+        }).encode('utf-8')
+        return self._build_result(body, result_class)
 
     async def _data_extraction_wrapper(self, url, query):
         """Validate data extraction query and make request.
@@ -117,13 +282,16 @@ class SlicingDice(SlicingDiceAPI):
         url(string) -- Url to make request
         query(dict) -- A data extraction query
         """
-        sd_extraction_result = validators.QueryDataExtractionValidator(query)
-        if sd_extraction_result.validator():
+        event = self._new_event()
+        if self._validate(validators.QueryDataExtractionValidator, query,
+                          event=event):
             return await self._make_request(
                 url=url,
-                json_data=ujson.dumps(query),
+                json_data=self._encode(query, event),
                 req_type="post",
-                key_level=0)
+                key_level=0,
+                result_class=DataExtractionResult,
+                event=event)
 
     async def _saved_query_wrapper(self, url, query, update=False):
         """Validate saved query and make request.
@@ -143,6 +311,7 @@ class SlicingDice(SlicingDiceAPI):
             req_type=req_type,
             key_level=2)
 
+    @with_deadline
     async def get_database(self):
         """Get a database associated with this client (related to keys passed
          on construction)"""
@@ -153,6 +322,7 @@ class SlicingDice(SlicingDiceAPI):
             key_level=2
         )
 
+    @with_deadline
     async def create_column(self, data):
         """Create column in Slicing Dice
 
@@ -163,12 +333,17 @@ class SlicingDice(SlicingDiceAPI):
         sd_data = validators.ColumnValidator(data)
         if sd_data.validator():
             url = SlicingDice.BASE_URL + URLResources.COLUMN
-            return await self._make_request(
-                url=url,
-                req_type="post",
-                json_data=ujson.dumps(data),
-                key_level=1)
-
+            try:
+                return await self._make_request(
+                    url=url,
+                    req_type="post",
+                    json_data=ujson.dumps(data),
+                    key_level=1)
+            finally:
+                if self._schema is not None:
+                    self._schema.invalidate()
+
+    @with_deadline
     async def get_columns(self):
         """Get a list of columns"""
         url = SlicingDice.BASE_URL + URLResources.COLUMN
@@ -177,31 +352,220 @@ class SlicingDice(SlicingDiceAPI):
             req_type="get",
             key_level=2)
 
+    @with_deadline
     async def insert(self, data):
         """Insert data into Slicing Dice API
 
         Keyword arguments:
         data -- A dictionary in the Slicing Dice data format
-            format.
+            format, or its encoded JSON as bytes or memoryview, sent as it
+            is.
         """
-        sd_data = validators.InsertValidator(data)
-        if sd_data.validator():
+        event = self._new_event()
+        if self._validate(validators.InsertValidator, data, event=event):
+            if (self._schema is not None and not is_encoded(data) and
+                    self.validation != validators.VALIDATION_OFF):
+                await self._check_schema(data, event)
             url = SlicingDice.BASE_URL + URLResources.INSERT
             return await self._make_request(
                 url=url,
-                json_data=ujson.dumps(data),
+                json_data=self._encode(data, event),
                 req_type="post",
-                key_level=1)
+                key_level=1,
+                invalidate_cache=True,
+                event=event)
+
+    @with_deadline
+    async def insert_many(self, data, auto_create=None,
+                          batch_size=validators.MAX_INSERTION_BATCH_SIZE,
+                          concurrency=None):
+        """Insert any number of entities, splitting them into batches
+        accepted by the API and sending the batches concurrently.
+
+        Keyword arguments:
+        data -- A dictionary in the Slicing Dice data format or an iterable
+            of (entity_id, columns) pairs
+        auto_create(list) -- The 'auto-create' value sent with each batch,
+            when data is a dictionary its own 'auto-create' is used
+        batch_size(int) -- Maximum number of entities per batch
+        concurrency(int) -- Maximum number of batches sent at once,
+            defaults to the client concurrency
+
+        Returns a dictionary with the total of inserted entities and the
+        result or the error of each batch.
+        """
+        if not 0 < batch_size <= validators.MAX_INSERTION_BATCH_SIZE:
+            raise exceptions.InvalidInsertException(
+                "The batch size must be between 1 and {}.".format(
+                    validators.MAX_INSERTION_BATCH_SIZE))
+        if isinstance(data, dict):
+            auto_create = data.get('auto-create', auto_create)
+            entities = ((entity_id, columns)
+                        for entity_id, columns in data.items()
+                        if entity_id != 'auto-create')
+        else:
+            entities = data
+        batches = enumerate(
+            chunk_insertion(entities, batch_size, auto_create))
+        results = await bounded_map(
+            self._insert_batch, batches, concurrency or self.concurrency)
+        return self._summarize_batches(results)
+
+    bulk_insert = insert_many
+
+    @with_deadline
+    async def insert_stream(self, records, auto_create=None,
+                            batch_size=validators.MAX_INSERTION_BATCH_SIZE,
+                            concurrency=None, id_column='entity-id'):
+        """Insert entities as they are produced, sending each batch as soon
+        as it is complete. At most `concurrency` batches are in flight and
+        `concurrency` more wait to be sent, reading from records is paused
+        while they are pending.
+
+        Keyword arguments:
+        records -- An iterable or async iterable of (entity_id, columns)
+            pairs or the path of a NDJSON or CSV file with one entity per
+            line
+        auto_create(list) -- The 'auto-create' value sent with each batch
+        batch_size(int) -- Maximum number of entities per batch
+        concurrency(int) -- Maximum number of batches sent at once,
+            defaults to the client concurrency
+        id_column(str) -- Field holding the entity id in NDJSON or CSV
+            files (default 'entity-id')
+
+        Returns the same summary as insert_many.
+        """
+        if not 0 < batch_size <= validators.MAX_INSERTION_BATCH_SIZE:
+            raise exceptions.InvalidInsertException(
+                "The batch size must be between 1 and {}.".format(
+                    validators.MAX_INSERTION_BATCH_SIZE))
+        if isinstance(records, str):
+            records = read_records(records, id_column)
+        concurrency = concurrency or self.concurrency
+        queue = asyncio.Queue(maxsize=concurrency)
+        results = []
+
+        async def produce():
+            index = 0
+            if hasattr(records, '__aiter__'):
+                batch = {}
+                async for entity_id, columns in records:
+                    if entity_id in batch:
+                        # Keep every record of a repeated id
+                        await queue.put((index, batch))
+                        index += 1
+                        batch = {}
+                    batch[entity_id] = columns
+                    if len(batch) == batch_size:
+                        await queue.put((index, batch))
+                        index += 1
+                        batch = {}
+                if batch:
+                    await queue.put((index, batch))
+            else:
+                for batch in chunk_insertion(records, batch_size):
+                    await queue.put((index, batch))
+                    index += 1
+            for _ in range(concurrency):
+                await queue.put(None)
+
+        async def consume():
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                index, batch = item
+                if auto_create is not None:
+                    batch['auto-create'] = auto_create
+                results.append(await self._insert_batch((index, batch)))
+
+        tasks = [asyncio.ensure_future(produce())]
+        tasks.extend(asyncio.ensure_future(consume())
+                     for _ in range(concurrency))
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        results.sort(key=lambda result: result['batch'])
+        return self._summarize_batches(results)
+
+    @staticmethod
+    def _summarize_batches(results):
+        """Aggregate the batch summaries of a bulk insertion.
+
+        Keyword arguments:
+        results(list) -- Summaries returned by _insert_batch
+        """
+        inserted = sum(result.get('inserted-entities', 0)
+                       for result in results)
+        entities = sum(result['entities'] for result in results)
+        failed = sum(1 for result in results if result['status'] != 'success')
+        status = 'success'
+        if failed:
+            status = 'error' if failed == len(results) else 'partial'
+        return {
+            'status': status,
+            'entities': entities,
+            'inserted-entities': inserted,
+            'failed-batches': failed,
+            'batches': results
+        }
 
-    async def count_entity(self, query):
+    @staticmethod
+    def _describe_error(error):
+        """Returns the exception type and message of a failed batch, with
+        the API error code when there is one.
+
+        Keyword arguments:
+        error(Exception) -- The exception raised by the batch
+        """
+        message = getattr(error, 'message', None) or ', '.join(
+            str(arg) for arg in error.args)
+        description = '{}: {}'.format(type(error).__name__, message)
+        code = getattr(error, 'code', None)
+        if code is not None:
+            description += ' (code {})'.format(code)
+        return description
+
+    async def _insert_batch(self, indexed_batch):
+        """Insert one batch of insert_many and summarize its outcome.
+
+        Keyword arguments:
+        indexed_batch(tuple) -- The batch position and the batch data
+        """
+        index, batch = indexed_batch
+        summary = {
+            'batch': index,
+            'entities': len(batch) - ('auto-create' in batch)
+        }
+        try:
+            response = self._load_result(await self.insert(batch))
+        except (exceptions.SlicingDiceException, ValueError) as e:
+            summary['status'] = 'error'
+            summary['error'] = self._describe_error(e)
+            return summary
+        summary['status'] = response.get('status', 'error')
+        summary['inserted-entities'] = response.get('inserted-entities', 0)
+        summary['result'] = response
+        return summary
+
+    @with_deadline
+    async def count_entity(self, query, split=False):
         """Make a count entity query
 
         Keyword arguments:
-        query -- A dictionary in the Slicing Dice query
+        query -- A dictionary in the Slicing Dice query, or its encoded
+            JSON as bytes or memoryview
+        split -- Split more than 10 queries into concurrent requests and
+            merge their results, pre-encoded queries aren't split
+            (default False)
         """
         url = SlicingDice.BASE_URL + URLResources.QUERY_COUNT_ENTITY
-        return await self._count_query_wrapper(url, query)
+        return await self._count_query_wrapper(url, query, split)
 
+    @with_deadline
     async def count_entity_total(self, dimensions=None):
         """Make a count entity total query
 
@@ -219,50 +583,83 @@ class SlicingDice(SlicingDiceAPI):
             json_data=ujson.dumps(query),
             key_level=0)
 
-    async def count_event(self, query):
+    @with_deadline
+    async def count_event(self, query, split=False):
         """Make a count event query
 
         Keyword arguments:
-        data -- A dictionary query
+        data -- A dictionary query, or its encoded JSON as bytes or
+            memoryview
+        split -- Split more than 10 queries into concurrent requests and
+            merge their results, pre-encoded queries aren't split
+            (default False)
         """
         url = SlicingDice.BASE_URL + URLResources.QUERY_COUNT_EVENT
-        return await self._count_query_wrapper(url, query)
+        return await self._count_query_wrapper(url, query, split)
 
+    @with_deadline
     async def aggregation(self, query):
         """Make a aggregation query
 
         Keyword arguments:
-        query -- An aggregation query
+        query -- An aggregation query, or its encoded JSON as bytes or
+            memoryview
         """
         url = SlicingDice.BASE_URL + URLResources.QUERY_AGGREGATION
-        if "query" not in query:
-            raise exceptions.InvalidQueryException(
-                "The aggregation query must have up the key 'query'.")
-        columns = query["query"]
-        if len(columns) > 5:
-            raise exceptions.MaxLimitException(
-                "The aggregation query must have up to 5 columns per request.")
+        event = self._new_event()
+        if is_encoded(query):
+            self._validate(None, query, event=event)
+        else:
+            if "query" not in query:
+                raise exceptions.InvalidQueryException(
+                    "The aggregation query must have up the key 'query'.")
+            columns = query["query"]
+            if len(columns) > 5:
+                raise exceptions.MaxLimitException(
+                    "The aggregation query must have up to 5 columns per "
+                    "request.")
         return await self._make_request(
             url=url,
-            json_data=ujson.dumps(query),
+            json_data=self._encode(query, event),
             req_type="post",
-            key_level=0)
+            key_level=0,
+            result_class=AggregationResult,
+            cache_query=query,
+            idempotent=True,
+            event=event)
 
-    async def top_values(self, query):
+    @with_deadline
+    async def top_values(self, query, split=False):
         """Make a top values query
 
         Keyword arguments:
-        query -- A dictionary query
+        query -- A dictionary query, or its encoded JSON as bytes or
+            memoryview
+        split -- Split more than 5 queries into concurrent requests and
+            merge their results, pre-encoded queries aren't split
+            (default False)
         """
         url = SlicingDice.BASE_URL + URLResources.QUERY_TOP_VALUES
-        sd_query_top_values = validators.QueryValidator(query)
-        if sd_query_top_values.validator():
+        if split and not is_encoded(query):
+            requests = split_queries(
+                query, validators.MAX_TOP_VALUES_QUERY_SIZE)
+            if len(requests) > 1:
+                responses = await bounded_map(
+                    self.top_values, requests, self.concurrency)
+                return self._merge_query_results(responses, TopValuesResult)
+        event = self._new_event()
+        if self._validate(validators.QueryValidator, query, event=event):
             return await self._make_request(
                 url=url,
-                json_data=ujson.dumps(query),
+                json_data=self._encode(query, event),
                 req_type="post",
-                key_level=0)
+                key_level=0,
+                result_class=TopValuesResult,
+                cache_query=query,
+                idempotent=True,
+                event=event)
 
+    @with_deadline
     async def exists_entity(self, ids, dimension=None):
         """Make a exists entity query
 
@@ -271,7 +668,7 @@ class SlicingDice(SlicingDiceAPI):
         dimension -- In which dimension entities check be checked
         """
         url = SlicingDice.BASE_URL + URLResources.QUERY_EXISTS_ENTITY
-        if len(ids) > 100:
+        if len(ids) > validators.MAX_EXISTS_IDS_SIZE:
             raise exceptions.MaxLimitException(
                 "The query exists entity must have up to 100 ids.")
         query = {
@@ -283,8 +680,46 @@ class SlicingDice(SlicingDiceAPI):
             url=url,
             json_data=ujson.dumps(query),
             req_type="post",
-            key_level=0)
+            key_level=0,
+            idempotent=True)
 
+    @with_deadline
+    async def exists_entities(self, ids, dimension=None, concurrency=None):
+        """Check if any number of entities exist, sending the ids in
+        concurrent requests of up to 100 ids
+
+        Keyword arguments:
+        ids -- A list with entities to check if exists
+        dimension -- In which dimension entities check be checked
+        concurrency -- Maximum number of requests sent at once, defaults
+            to the client concurrency
+
+        Returns a single response with the 'exists' and 'not-exists' lists
+        of every request.
+        """
+        size = validators.MAX_EXISTS_IDS_SIZE
+        chunks = [ids[start:start + size]
+                  for start in range(0, len(ids), size)]
+        responses = await bounded_map(
+            lambda chunk: self.exists_entity(chunk, dimension),
+            chunks, concurrency or self.concurrency)
+        exists = []
+        not_exists = []
+        took = 0
+        for response in responses:
+            decoded = self._load_result(response)
+            exists.extend(decoded.get('exists', []))
+            not_exists.extend(decoded.get('not-exists', []))
+            took = max(took, decoded.get('took') or 0)
+        body = ujson.dumps({
+            'status': 'success',
+            'exists': exists,
+            'not-exists': not_exists,
+            'took': took
+        }).encode('utf-8')
+        return self._build_result(body)
+
+    @with_deadline
     async def get_saved_query(self, query_name):
         """Get a saved query
 
@@ -297,6 +732,7 @@ class SlicingDice(SlicingDiceAPI):
             req_type="get",
             key_level=0)
 
+    @with_deadline
     async def get_saved_queries(self):
         """Get all saved queries
 
@@ -309,6 +745,7 @@ class SlicingDice(SlicingDiceAPI):
             req_type="get",
             key_level=2)
 
+    @with_deadline
     async def delete_saved_query(self, query_name):
         """Delete a saved query
 
@@ -322,6 +759,7 @@ class SlicingDice(SlicingDiceAPI):
             key_level=2
         )
 
+    @with_deadline
     async def create_saved_query(self, query):
         """Get a list of queries saved
 
@@ -331,6 +769,7 @@ class SlicingDice(SlicingDiceAPI):
         url = SlicingDice.BASE_URL + URLResources.QUERY_SAVED
         return await self._saved_query_wrapper(url, query)
 
+    @with_deadline
     async def update_saved_query(self, name, query):
         """Get a list of queries saved
 
@@ -341,24 +780,118 @@ class SlicingDice(SlicingDiceAPI):
         url = SlicingDice.BASE_URL + URLResources.QUERY_SAVED + name
         return await self._saved_query_wrapper(url, query, True)
 
+    @with_deadline
     async def result(self, query):
         """Get a data extraction result
 
         Keyword arguments:
-        query -- A dictionary query
+        query -- A dictionary query, or its encoded JSON as bytes or
+            memoryview
         """
         url = SlicingDice.BASE_URL + URLResources.QUERY_DATA_EXTRACTION_RESULT
         return await self._data_extraction_wrapper(url, query)
 
+    @with_deadline
     async def score(self, query):
         """Get a data extraction score
 
         Keyword arguments:
-        query -- A dictionary query
+        query -- A dictionary query, or its encoded JSON as bytes or
+            memoryview
         """
         url = SlicingDice.BASE_URL + URLResources.QUERY_DATA_EXTRACTION_SCORE
         return await self._data_extraction_wrapper(url, query)
 
+    def iter_result(self, query, prefetch=1, timeout=None, deadline=None):
+        """Iterate over every record of a data extraction result, page by
+        page. Returns an async generator.
+
+        Keyword arguments:
+        query -- A dictionary query
+        prefetch -- Number of pages fetched ahead while the current page
+            is consumed (default 1)
+        timeout -- Seconds to fetch every page (default None)
+        deadline -- time.monotonic() value by which every page must be
+            fetched (default None)
+        """
+        url = SlicingDice.BASE_URL + URLResources.QUERY_DATA_EXTRACTION_RESULT
+        return self._iter_data_extraction(
+            url, query, prefetch, deadline_from(timeout, deadline))
+
+    def iter_score(self, query, prefetch=1, timeout=None, deadline=None):
+        """Iterate over every record of a data extraction score, page by
+        page. Returns an async generator.
+
+        Keyword arguments:
+        query -- A dictionary query
+        prefetch -- Number of pages fetched ahead while the current page
+            is consumed (default 1)
+        timeout -- Seconds to fetch every page (default None)
+        deadline -- time.monotonic() value by which every page must be
+            fetched (default None)
+        """
+        url = SlicingDice.BASE_URL + URLResources.QUERY_DATA_EXTRACTION_SCORE
+        return self._iter_data_extraction(
+            url, query, prefetch, deadline_from(timeout, deadline))
+
+    async def _iter_data_extraction(self, url, query, prefetch,
+                                    deadline=None):
+        """Yield the records of every page of a data extraction query.
+        Pages are fetched by a background task, following the 'next-page'
+        token, into a queue holding up to `prefetch` pages.
+
+        Keyword arguments:
+        url(string) -- Url to make request
+        query(dict) -- A data extraction query
+        prefetch(int) -- Maximum number of pages waiting to be consumed
+        deadline(float) -- time.monotonic() value by which every page
+            must be fetched, raising RequestTimeoutException after it
+            (default None)
+        """
+        pages = asyncio.Queue(maxsize=max(1, prefetch))
+
+        async def fetch_pages():
+            page_query = query
+            try:
+                while True:
+                    page = self._load_result(await wait_until(
+                        self._data_extraction_wrapper(url, page_query),
+                        deadline))
+                    await pages.put(page)
+                    next_page = page.get('next-page')
+                    if not next_page or not page.get('data'):
+                        break
+                    page_query = dict(query, page_token=next_page)
+            except asyncio.CancelledError:
+                # An Exception before Python 3.8, not an error to deliver
+                raise
+            except Exception as e:
+                await pages.put(e)
+                return
+            await pages.put(None)
+
+        fetcher = asyncio.ensure_future(fetch_pages())
+        try:
+            while True:
+                page = await pages.get()
+                if page is None:
+                    return
+                if isinstance(page, Exception):
+                    raise page
+                data = page.get('data') or []
+                if isinstance(data, dict):
+                    # Data keyed by entity id holds one record per entity
+                    for entity_id, columns in data.items():
+                        record = dict(columns)
+                        record.setdefault('entity-id', entity_id)
+                        yield record
+                else:
+                    for record in data:
+                        yield record
+        finally:
+            fetcher.cancel()
+
+    @with_deadline
     async def sql(self, query):
         """ Make a sql query to SlicingDice
 
@@ -366,35 +899,50 @@ class SlicingDice(SlicingDiceAPI):
         :return: The response from the SlicingDice
         """
         url = SlicingDice.BASE_URL + URLResources.QUERY_SQL
+        select = query.lstrip()[:6].upper() == 'SELECT'
         return await self._make_request(
             url=url,
             string_data=query,
             req_type="post",
             key_level=0,
-            content_type='application/sql')
+            content_type='application/sql',
+            invalidate_cache=not select,
+            idempotent=select)
 
+    @with_deadline
     async def delete(self, query):
         """ Make a delete request
 
-        :param query: The query that represents the data to be deleted
+        :param query: The query that represents the data to be deleted, or
+            its encoded JSON as bytes or memoryview
         :return: The response from the SlicingDice
         """
         url = SlicingDice.BASE_URL + URLResources.DELETE
+        event = self._new_event()
+        self._validate(None, query, event=event)
         return await self._make_request(
             url=url,
-            string_data=ujson.dumps(query),
+            string_data=self._encode(query, event),
             req_type="post",
-            key_level=2)
+            key_level=2,
+            invalidate_cache=True,
+            event=event)
 
+    @with_deadline
     async def update(self, query):
         """ Make a update request
 
-        :param query: The query that represents the data to be updated
+        :param query: The query that represents the data to be updated, or
+            its encoded JSON as bytes or memoryview
         :return: The response from the SlicingDice
         """
         url = SlicingDice.BASE_URL + URLResources.UPDATE
+        event = self._new_event()
+        self._validate(None, query, event=event)
         return await self._make_request(
             url=url,
-            string_data=ujson.dumps(query),
+            string_data=self._encode(query, event),
             req_type="post",
-            key_level=2)
\ No newline at end of file
+            key_level=2,
+            invalidate_cache=True,
+            event=event)
\ No newline at end of file
@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import re
+import time
+from collections import OrderedDict
+
+import ujson
+
+from ..utils.data_utils import is_encoded
+
+_ENCODED_BYPASS = re.compile(br'"bypass-cache"\s*:\s*true')
+
+
+def bypasses_cache(query):
+    """Check if a query asks the API to skip its cache
+
+    Keyword arguments:
+    query(dict, list or bytes) -- The query or its encoded JSON
+    """
+    if is_encoded(query):
+        return _ENCODED_BYPASS.search(query) is not None
+    if isinstance(query, dict):
+        return bool(query.get('bypass-cache'))
+    if isinstance(query, list):
+        return any(isinstance(item, dict) and item.get('bypass-cache')
+                   for item in query)
+    return False
+
+
+def _without_bypass(query):
+    """Returns the query without its 'bypass-cache' flags"""
+    if isinstance(query, dict) and 'bypass-cache' in query:
+        return {key: value for key, value in query.items()
+                if key != 'bypass-cache'}
+    if isinstance(query, list):
+        return [_without_bypass(item) for item in query]
+    return query
+
+
+class ResultCache(object):
+    """In memory cache of query results with TTL and LRU eviction.
+
+    Entries are keyed by endpoint, key level and the query in canonical
+    form, so equal queries built in a different key order share an entry.
+    A query with 'bypass-cache' skips the lookup and refreshes the entry of
+    the same query without the flag. Pre-encoded queries are keyed by their
+    exact bytes.
+    """
+
+    def __init__(self, ttl=60, endpoint_ttls=None, max_entries=1024,
+                 max_bytes=64 * 1024 * 1024):
+        """
+        Keyword arguments:
+        ttl(float) -- Seconds a result is kept (default 60)
+        endpoint_ttls(dict) -- Seconds a result is kept for specific
+            endpoints, keyed by URLResources path, e.g.
+            {URLResources.QUERY_TOP_VALUES: 300} (default None)
+        max_entries(int) -- Maximum number of results kept (default 1024)
+        max_bytes(int) -- Maximum size of the results kept (default 64MB)
+        """
+        self.ttl = ttl
+        self.endpoint_ttls = endpoint_ttls or {}
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.size = 0
+        self.generation = 0
+        self._entries = OrderedDict()
+
+    @staticmethod
+    def make_key(url, key_level, query):
+        """Returns the cache key of a query
+
+        Keyword arguments:
+        url(string) -- The request url
+        key_level(int) -- The key level of the request
+        query(dict, list or bytes) -- The query or its encoded JSON
+        """
+        if is_encoded(query):
+            return '{} {} {}'.format(
+                url, key_level, bytes(query).decode('utf-8', 'replace'))
+        return '{} {} {}'.format(
+            url, key_level,
+            ujson.dumps(_without_bypass(query), sort_keys=True))
+
+    def _ttl_for(self, url):
+        for endpoint, ttl in self.endpoint_ttls.items():
+            if url.endswith(endpoint):
+                return ttl
+        return self.ttl
+
+    def get(self, key):
+        """Returns the cached body of a key or None when missing or
+        expired
+
+        Keyword arguments:
+        key(string) -- The cache key
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, body = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return body
+            self._remove(key)
+        self.misses += 1
+        return None
+
+    def put(self, key, url, body, generation=None):
+        """Store a response body
+
+        Keyword arguments:
+        key(string) -- The cache key
+        url(string) -- The request url, used to choose the TTL
+        body(bytes) -- The response body
+        generation(int) -- The cache generation when the request started,
+            results older than the last invalidation are not stored
+        """
+        if generation is not None and generation != self.generation:
+            return
+        ttl = self._ttl_for(url)
+        entry_size = len(key) + len(body)
+        if ttl <= 0 or entry_size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.monotonic() + ttl, body)
+        self.size += entry_size
+        while (len(self._entries) > self.max_entries or
+               self.size > self.max_bytes):
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self.evictions += 1
+
+    def _remove(self, key):
+        _, body = self._entries.pop(key)
+        self.size -= len(key) + len(body)
+
+    def clear(self):
+        """Remove every result, e.g. after data changes"""
+        self._entries.clear()
+        self.size = 0
+        self.generation += 1
+
+    def stats(self):
+        """Returns hit, miss, eviction and size counters"""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': len(self._entries),
+            'bytes': self.size
+        }
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Per-call timeouts and deadlines.
+
+A deadline is a time.monotonic() value. A call given a timeout or a
+deadline runs in a task cancelled when the deadline expires, so every
+phase counts towards it: validation, the rate limiter and lane queues,
+waiting for a pooled connection, retries with their backoff and the
+network. Cancelling the task closes the connection of the request in
+flight instead of waiting for its response.
+"""
+
+import asyncio
+import functools
+import inspect
+import time
+
+from .. import exceptions
+
+
+def deadline_from(timeout=None, deadline=None):
+    """Returns the earliest of deadline and timeout seconds from now, None
+    when neither is informed
+
+    Keyword arguments:
+    timeout(float) -- Seconds the call may take (default None)
+    deadline(float) -- time.monotonic() value by which the call must
+        complete (default None)
+    """
+    if timeout is not None:
+        timeout_deadline = time.monotonic() + timeout
+        if deadline is None or timeout_deadline < deadline:
+            return timeout_deadline
+    return deadline
+
+
+async def wait_until(awaitable, deadline):
+    """Returns the result of awaitable, cancelling it and raising
+    RequestTimeoutException when it doesn't complete before the deadline
+
+    Keyword arguments:
+    awaitable -- The coroutine to run
+    deadline(float) -- time.monotonic() value, None waits without limit
+    """
+    if deadline is None:
+        return await awaitable
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        raise exceptions.RequestTimeoutException(
+            "The deadline expired before the call started.")
+    try:
+        return await asyncio.wait_for(awaitable, remaining)
+    except asyncio.TimeoutError:
+        raise exceptions.RequestTimeoutException(
+            "The call didn't complete within {:.3f} seconds.".format(
+                remaining))
+
+
+def with_deadline(method):
+    """Adds the keyword arguments timeout, in seconds, and deadline, a
+    time.monotonic() value, to a client coroutine method. When either is
+    informed the call raises RequestTimeoutException once the earliest of
+    them expires."""
+    @functools.wraps(method)
+    async def call(self, *args, timeout=None, deadline=None, **kwargs):
+        if timeout is None and deadline is None:
+            return await method(self, *args, **kwargs)
+        return await wait_until(method(self, *args, **kwargs),
+                                deadline_from(timeout, deadline))
+
+    # Show the added arguments in help() and inspect.signature()
+    signature = inspect.signature(method)
+    call.__signature__ = signature.replace(parameters=list(
+        signature.parameters.values()) + [
+        inspect.Parameter(name, inspect.Parameter.KEYWORD_ONLY, default=None)
+        for name in ('timeout', 'deadline')])
+    return call
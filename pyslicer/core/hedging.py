@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from .instrumentation import Histogram
+
+# Upper bounds, in seconds, of the latency buckets: 1ms to about 17 minutes,
+# about 19% apart, so the hedge delay is close to the actual percentile
+HEDGE_BUCKETS = tuple(0.001 * 2 ** (power / 4.0) for power in range(81))
+
+
+class HedgePolicy(object):
+    """Decide when an idempotent read is sent a second time.
+
+    The response times of each endpoint are kept in a histogram. When the
+    first request of a read hasn't answered after the `percentile` of the
+    recent response times, an identical request is sent, the first
+    response wins and the other request is cancelled. Every read adds
+    `budget_ratio` tokens to a budget shared by the client and every hedge
+    spends one, so hedging adds at most about `budget_ratio` extra requests
+    per read.
+    """
+
+    def __init__(self, percentile=95, min_delay=0.005, min_samples=50,
+                 window=1000, budget=10, budget_ratio=0.05):
+        """
+        Keyword arguments:
+        percentile(float) -- Percentile of the recent response times of an
+            endpoint after which a read is hedged (default 95)
+        min_delay(float) -- Minimum seconds to wait before hedging
+            (default 0.005)
+        min_samples(int) -- Responses of an endpoint needed before its
+            reads are hedged (default 50)
+        window(int) -- The counts of an endpoint are halved after this
+            many responses, so recent responses weigh more (default 1000)
+        budget(int) -- Maximum number of hedge tokens kept (default 10)
+        budget_ratio(float) -- Hedge tokens earned by each read
+            (default 0.05)
+        """
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.window = window
+        self.budget = budget
+        self.budget_ratio = budget_ratio
+        self._tokens = float(budget)
+        self._latencies = {}
+        self.reads = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def on_request(self):
+        """Earn hedge tokens for a new read"""
+        self.reads += 1
+        self._tokens = min(self.budget, self._tokens + self.budget_ratio)
+
+    def delay(self, url):
+        """Returns the seconds to wait before hedging a read, None when
+        the endpoint has too few responses
+
+        Keyword arguments:
+        url(str) -- The endpoint url
+        """
+        latencies = self._latencies.get(url)
+        if latencies is None or latencies.count < self.min_samples:
+            return None
+        return max(self.min_delay, latencies.percentile(self.percentile))
+
+    def should_hedge(self):
+        """Check if a slow read may be sent again, spending a hedge token
+        when it may"""
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        self.hedges += 1
+        return True
+
+    def record(self, url, latency, hedge_won=False):
+        """Add the response time of a read
+
+        Keyword arguments:
+        url(str) -- The endpoint url
+        latency(float) -- Seconds the winning request took to answer
+        hedge_won(bool) -- The hedge answered before the first request
+        """
+        latencies = self._latencies.get(url)
+        if latencies is None:
+            latencies = self._latencies[url] = Histogram(HEDGE_BUCKETS)
+        elif latencies.count >= self.window:
+            latencies.decay()
+        latencies.add(latency)
+        self.hedge_wins += hedge_won
+
+    def stats(self):
+        """Returns the reads, the hedges sent and the hedges that answered
+        first"""
+        return {
+            'reads': self.reads,
+            'hedges': self.hedges,
+            'hedge-wins': self.hedge_wins
+        }
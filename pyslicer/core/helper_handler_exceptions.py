@@ -1,6 +1,8 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import ujson
+
 from .. import exceptions
 from collections import defaultdict
 
@@ -17,3 +19,29 @@ slicer_exceptions = defaultdict(
     lambda: exceptions.SlicingDiceException,
     __mapped_errors
 )
+
+
+def raise_for_errors(status, body):
+    """Raise the exception mapped to the API error in a response, if any.
+
+    Keyword arguments:
+    status(int) -- The HTTP status of the response
+    body(bytes) -- The response body
+    """
+    # Only bodies that can hold an error are parsed
+    if status < 400 and b'"errors"' not in body:
+        return
+    try:
+        result = ujson.loads(body)
+    except ValueError:
+        result = None
+    if isinstance(result, dict) and result.get('errors'):
+        error = result['errors'][0]
+        code = error.get('code')
+        raise slicer_exceptions[code](
+            code=code, message=error.get('message'), status=status,
+            **{'more-info': error.get('more-info')})
+    if status >= 400:
+        raise exceptions.SlicingDiceHTTPError(
+            code=status, message=body.decode('utf-8', 'replace'),
+            status=status)
@@ -0,0 +1,241 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Per-request instrumentation.
+
+When a client has an instrumentation, every call of an API method emits a
+RequestEvent once it completes, successfully or not, with the time spent
+in each phase of the request. MetricsAggregator is an instrumentation that
+keeps counters and latency histograms per route in memory.
+"""
+
+import bisect
+import time
+from collections import Counter
+
+import aiohttp
+
+from ..url_resources import URLResources
+
+# Phases of a request, in the order they happen. 'queue' is the time
+# waiting for the rate limiter and 'backoff' the time sleeping between
+# retries; 'connection' is the time waiting for a pooled connection or
+# opening a new one and 'network' the rest of each attempt
+PHASES = ('validation', 'serialization', 'queue', 'connection', 'network',
+          'backoff', 'decoding')
+
+# Upper bounds, in seconds, of the latency histogram buckets: 100us to
+# about 100s, doubling
+DEFAULT_BUCKETS = tuple(0.0001 * 2 ** power for power in range(21))
+
+
+class RequestEvent(object):
+    """Timing and outcome of one API call"""
+    __slots__ = PHASES + (
+        'route', 'method', 'key_level', 'status', 'error', 'bytes_sent',
+        'bytes_received', 'retries', 'cache_hit', 'coalesced', 'hedged',
+        'total')
+
+    def __init__(self):
+        for phase in PHASES:
+            setattr(self, phase, 0.0)
+        self.route = None
+        self.method = None
+        self.key_level = None
+        self.status = None
+        self.error = None
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.retries = 0
+        self.cache_hit = False
+        self.coalesced = False
+        self.hedged = False
+        self.total = 0.0
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        return 'RequestEvent({!r})'.format(self.as_dict())
+
+
+def route_of(path):
+    """Returns the URLResources route of a request path
+
+    Keyword arguments:
+    path(str) -- The url without the API address
+    """
+    if path.startswith(URLResources.QUERY_SAVED):
+        # Saved query urls end with the query name
+        return URLResources.QUERY_SAVED
+    return path
+
+
+def trace_config():
+    """Returns an aiohttp trace config adding the time spent acquiring a
+    connection to the RequestEvent given as trace_request_ctx"""
+    config = aiohttp.TraceConfig()
+
+    async def start(session, context, params):
+        context.started = time.perf_counter()
+
+    async def end(session, context, params):
+        event = context.trace_request_ctx
+        if event is not None:
+            event.connection += time.perf_counter() - context.started
+
+    config.on_connection_queued_start.append(start)
+    config.on_connection_queued_end.append(end)
+    config.on_connection_create_start.append(start)
+    config.on_connection_create_end.append(end)
+    return config
+
+
+class Instrumentation(object):
+    """Receives an event for every API call. Subclass it and override
+    on_request, which must not block."""
+
+    def on_request(self, event):
+        """Called when an API call completes
+
+        Keyword arguments:
+        event(RequestEvent) -- The timing and outcome of the call
+        """
+
+
+class Histogram(object):
+    """Counts of values within fixed buckets"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def decay(self):
+        """Halve the counts, so the values added before weigh half as
+        much as the ones added after"""
+        counts = [(count + 1) // 2 for count in self.counts]
+        total = sum(counts)
+        if self.count:
+            self.sum *= total / self.count
+        self.counts = counts
+        self.count = total
+
+    def percentile(self, percent):
+        """Returns the upper bound of the bucket holding the percentile,
+        the maximum for the values above the last bucket"""
+        if not self.count:
+            return None
+        rank = self.count * percent / 100.0
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                if index < len(self.buckets):
+                    return min(self.buckets[index], self.max)
+                break
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean': self.sum / self.count if self.count else None,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'max': self.max
+        }
+
+
+class _RouteMetrics(object):
+    __slots__ = ('requests', 'errors', 'statuses', 'retries', 'bytes_sent',
+                 'bytes_received', 'cache_hits', 'coalesced', 'hedged',
+                 'latency')
+
+    def __init__(self, buckets):
+        self.requests = 0
+        self.errors = Counter()
+        self.statuses = Counter()
+        self.retries = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.cache_hits = 0
+        self.coalesced = 0
+        self.hedged = 0
+        self.latency = {phase: Histogram(buckets)
+                        for phase in ('total',) + PHASES}
+
+
+class MetricsAggregator(Instrumentation):
+    """Counters and latency histograms per route, kept in memory.
+
+        metrics = MetricsAggregator()
+        sd = SlicingDice(master_key='my-token', instrumentation=metrics)
+        ...
+        print(metrics.snapshot()[URLResources.INSERT]['latency']['total'])
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        """
+        Keyword arguments:
+        buckets(tuple) -- Sorted upper bounds, in seconds, of the latency
+            histogram buckets (default 100us to about 100s, doubling)
+        """
+        self.buckets = buckets
+        self._routes = {}
+
+    def on_request(self, event):
+        metrics = self._routes.get(event.route)
+        if metrics is None:
+            metrics = self._routes[event.route] = _RouteMetrics(
+                self.buckets)
+        metrics.requests += 1
+        if event.error is not None:
+            metrics.errors[event.error] += 1
+        if event.status is not None:
+            metrics.statuses[event.status] += 1
+        metrics.retries += event.retries
+        metrics.bytes_sent += event.bytes_sent
+        metrics.bytes_received += event.bytes_received
+        metrics.cache_hits += event.cache_hit
+        metrics.coalesced += event.coalesced
+        metrics.hedged += event.hedged
+        latency = metrics.latency
+        latency['total'].add(event.total)
+        for phase in PHASES:
+            latency[phase].add(getattr(event, phase))
+
+    def snapshot(self):
+        """Returns the counters and latency summaries, in seconds, of each
+        route"""
+        return {route: {
+            'requests': metrics.requests,
+            'errors': dict(metrics.errors),
+            'statuses': dict(metrics.statuses),
+            'retries': metrics.retries,
+            'bytes-sent': metrics.bytes_sent,
+            'bytes-received': metrics.bytes_received,
+            'cache-hits': metrics.cache_hits,
+            'coalesced': metrics.coalesced,
+            'hedged': metrics.hedged,
+            'latency': {phase: histogram.summary()
+                        for phase, histogram in metrics.latency.items()}
+        } for route, metrics in self._routes.items()}
+
+    def histogram(self, route, phase='total'):
+        """Returns the Histogram of a route and phase, None when the route
+        has no requests"""
+        metrics = self._routes.get(route)
+        return None if metrics is None else metrics.latency[phase]
+
+    def reset(self):
+        self._routes.clear()
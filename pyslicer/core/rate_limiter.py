@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import asyncio
+import time
+
+
+class TokenBucket(object):
+    """Token bucket shared by every coroutine using it"""
+
+    def __init__(self, rate, capacity=None):
+        """
+        Keyword arguments:
+        rate(float) -- Tokens added per second
+        capacity(float) -- Maximum tokens stored, which is the allowed
+            burst, defaults to one second worth of tokens
+        """
+        self.rate = float(rate)
+        self.capacity = float(capacity or rate)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = None
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity,
+            self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    async def acquire(self, amount=1):
+        """Wait until the bucket has enough tokens and take them. Waiters
+        are served in arrival order.
+
+        Keyword arguments:
+        amount(float) -- Tokens to take, amounts above the capacity are
+            taken as soon as the bucket is full (default 1)
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            self._refill()
+            needed = min(amount, self.capacity)
+            if self._tokens < needed:
+                await asyncio.sleep((needed - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= amount
+
+
+class RateLimiter(object):
+    """Client side limit of requests and payload bytes per second, with
+    separate buckets for each key level (read, write and admin)"""
+
+    def __init__(self, requests_per_second=None, bytes_per_second=None,
+                 burst=None):
+        """
+        Keyword arguments:
+        requests_per_second(float or dict) -- Requests allowed per second,
+            a dict maps each key level (0 read, 1 write, 2 admin) to its
+            own rate, levels missing are not limited (default None)
+        bytes_per_second(float or dict) -- Request body bytes allowed per
+            second, in the same format (default None)
+        burst(float) -- Requests allowed at once, defaults to one second
+            worth of requests
+        """
+        self._request_buckets = self._build_buckets(
+            requests_per_second, burst)
+        self._byte_buckets = self._build_buckets(bytes_per_second)
+
+    @staticmethod
+    def _build_buckets(rates, capacity=None):
+        if rates is None:
+            return {}
+        if not isinstance(rates, dict):
+            rates = {key_level: rates for key_level in (0, 1, 2)}
+        return {key_level: TokenBucket(rate, capacity)
+                for key_level, rate in rates.items() if rate}
+
+    async def acquire(self, key_level, size=0):
+        """Wait until a request of the key level can be sent
+
+        Keyword arguments:
+        key_level(int) -- The key level of the request
+        size(int) -- The request body size in bytes (default 0)
+        """
+        request_bucket = self._request_buckets.get(key_level)
+        if request_bucket is not None:
+            await request_bucket.acquire()
+        byte_bucket = self._byte_buckets.get(key_level)
+        if byte_bucket is not None and size:
+            await byte_bucket.acquire(size)
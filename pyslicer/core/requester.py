@@ -1,55 +1,74 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
-import aiohttp
+import gzip
+import zlib
 
-from .. import exceptions
+# PoolConfig is imported for code importing it from this module
+from .transport import AiohttpTransport, PoolConfig
+
+COMPRESSION_LEVEL = 6
+
+
+def compress(data, encoding):
+    """Compress a request body. Returns the compressed bytes.
+
+    Keyword arguments:
+    data(bytes) -- The request body
+    encoding(str) -- The content encoding, 'gzip' or 'deflate'
+    """
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=COMPRESSION_LEVEL)
+    elif encoding == 'deflate':
+        return zlib.compress(data, COMPRESSION_LEVEL)
+    raise ValueError("Unsupported content encoding: {}".format(encoding))
 
 
 class Requester(object):
-    def __init__(self, use_ssl, timeout):
-        self.use_ssl = use_ssl
-        self.session = aiohttp.ClientSession(read_timeout=timeout)
-
-    async def post(self, url, data, headers):
-        """Executes a post request result object"""
-        try:
-            async with self.session.post(url, data=data, headers=headers,
-                                         verify_ssl=self.use_ssl) as resp:
-                return resp.status, await resp.text()
-        except aiohttp.ClientConnectorError as e:
-            raise exceptions.SlicingDiceHTTPError(e)
-        except aiohttp.ServerTimeoutError as e:
-            raise exceptions.SlicingDiceHTTPError(e)
-
-    async def put(self, url, data, headers):
-        """Returns a put request result object"""
-        try:
-            async with self.session.put(url, data=data, headers=headers,
-                                        verify_ssl=self.use_ssl) as resp:
-                return resp.status, await resp.text()
-        except aiohttp.ClientConnectorError as e:
-            raise exceptions.SlicingDiceHTTPError(e)
-        except aiohttp.ServerTimeoutError as e:
-            raise exceptions.SlicingDiceHTTPError(e)
-
-    async def get(self, url, headers):
-        """Returns a get request result object"""
-        try:
-            async with self.session.get(url, headers=headers,
-                                        verify_ssl=self.use_ssl) as resp:
-                return resp.status, await resp.text()
-        except aiohttp.ClientConnectorError as e:
-            raise exceptions.SlicingDiceHTTPError(e)
-        except aiohttp.ServerTimeoutError as e:
-            raise exceptions.SlicingDiceHTTPError(e)
-
-    async def delete(self, url, headers):
-        """Returns a delete request result object"""
-        try:
-            async with self.session.delete(url, headers=headers,
-                                           verify_ssl=self.use_ssl) as resp:
-                return resp.status, await resp.text()
-        except aiohttp.ClientConnectorError as e:
-            raise exceptions.SlicingDiceHTTPError(e)
-        except aiohttp.ServerTimeoutError as e:
-            raise exceptions.SlicingDiceHTTPError(e)
+    def __init__(self, use_ssl, timeout, pool_config=None, compression=None,
+                 compression_threshold=1024, trace=False, transport=None):
+        """
+        Keyword arguments:
+        use_ssl(bool) -- Verify the certificates of HTTPS requests
+        timeout(float) -- Seconds to wait for each request
+        pool_config(PoolConfig) -- Connection pool settings (default None)
+        compression(str) -- Content encoding of large request bodies,
+            'gzip' or 'deflate' (default None)
+        compression_threshold(int) -- Minimum body size, in bytes, to be
+            compressed (default 1024)
+        trace(bool) -- Time the connection phase of requests (default
+            False)
+        transport(Transport) -- Sends the requests, defaults to an
+            AiohttpTransport built from the other arguments
+        """
+        if compression not in (None, 'gzip', 'deflate'):
+            raise ValueError(
+                "Unsupported content encoding: {}".format(compression))
+        self.compression = compression
+        self.compression_threshold = compression_threshold
+        if transport is None:
+            transport = AiohttpTransport(use_ssl, timeout, pool_config, trace)
+        self.transport = transport
+
+    def prepare_body(self, data):
+        """Compress the request body when it is larger than the compression
+        threshold. Returns the body to send and its content encoding, None
+        when it isn't compressed.
+
+        Keyword arguments:
+        data(str or bytes) -- The request body
+        """
+        if (self.compression is None or data is None or
+                len(data) < self.compression_threshold):
+            return data, None
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        return compress(data, self.compression), self.compression
+
+    async def close(self):
+        """Closes the transport and every pooled connection"""
+        await self.transport.close()
+
+    def request(self, method, url, headers, data=None, event=None):
+        """Returns the transport coroutine executing a request, see
+        Transport.request"""
+        return self.transport.request(method, url, headers, data, event)
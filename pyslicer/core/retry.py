@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import random
+
+from .. import exceptions
+
+
+class RetryPolicy(object):
+    """Decide which failed requests are retried and how long to wait.
+
+    Rate limit errors, 5xx responses, connection errors and timeouts are
+    retried with exponential backoff. Writes may have been applied when a
+    5xx response, a dropped connection or a timeout hides their result, so
+    they are only retried after rate limit errors and connections that
+    couldn't be established, unless `retry_writes` is set. Every request
+    adds `budget_ratio` tokens to a budget shared by the client and every
+    retry spends one, so retries can't multiply the load when the API is
+    down.
+    """
+
+    def __init__(self, max_retries=3, base_delay=0.1, max_delay=10.0,
+                 jitter=True, budget=100, budget_ratio=0.2,
+                 retry_writes=False):
+        """
+        Keyword arguments:
+        max_retries(int) -- Retries of a single request, 0 disables
+            retries (default 3)
+        base_delay(float) -- Seconds to wait before the first retry, doubled
+            on each following retry (default 0.1)
+        max_delay(float) -- Maximum seconds between retries (default 10)
+        jitter(bool) -- Wait a random time between zero and the backoff
+            delay, spreading retries of concurrent requests (default True)
+        budget(int) -- Maximum number of retry tokens kept (default 100)
+        budget_ratio(float) -- Retry tokens earned by each request
+            (default 0.2)
+        retry_writes(bool) -- Retry writes after every transient error,
+            which can apply them twice (default False)
+        """
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.budget = budget
+        self.budget_ratio = budget_ratio
+        self.retry_writes = retry_writes
+        self._tokens = float(budget)
+
+    @staticmethod
+    def is_transient(error):
+        """Check if a request failed by an error worth retrying
+
+        Keyword arguments:
+        error(SlicingDiceException) -- The request error
+        """
+        if isinstance(error, exceptions.RequestRateLimitException):
+            return True
+        if error.status is not None:
+            # API errors in 5xx responses are transient whatever their code
+            return error.status >= 500 or error.status == 429
+        if isinstance(error, exceptions.SlicingDiceHTTPError):
+            # Errors without code come from connection failures and timeouts
+            return error.code is None or error.code >= 500
+        return False
+
+    @staticmethod
+    def was_rejected(error):
+        """Check if a request failed before the API could apply it
+
+        Keyword arguments:
+        error(SlicingDiceException) -- The request error
+        """
+        return (isinstance(error, (exceptions.RequestRateLimitException,
+                                   exceptions.ConnectionFailedException)) or
+                error.status == 429)
+
+    def on_request(self):
+        """Earn retry tokens for a new request"""
+        self._tokens = min(self.budget, self._tokens + self.budget_ratio)
+
+    def should_retry(self, error, attempt, idempotent=True):
+        """Check if a failed request should be retried, spending a retry
+        token when it should
+
+        Keyword arguments:
+        error(SlicingDiceException) -- The request error
+        attempt(int) -- Number of retries already made
+        idempotent(bool) -- Sending the request twice has the effect of
+            sending it once, False for writes (default True)
+        """
+        if attempt >= self.max_retries or not self.is_transient(error):
+            return False
+        if not (idempotent or self.retry_writes or
+                self.was_rejected(error)):
+            return False
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    def backoff(self, attempt):
+        """Returns the seconds to wait before a retry
+
+        Keyword arguments:
+        attempt(int) -- Number of retries already made
+        """
+        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+        if self.jitter:
+            return random.uniform(0, delay)
+        return delay
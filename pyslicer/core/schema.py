@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import asyncio
+import time
+
+from ..utils import validators
+
+
+class SchemaCache(object):
+    """Column types of the database, used to check inserts before sending
+    them.
+
+    The columns are loaded with get_columns on the first insert, loaded
+    again once the TTL expires and after create_column. Loading requires
+    the master key.
+    """
+
+    def __init__(self, ttl=300, coerce=False):
+        """
+        Keyword arguments:
+        ttl(float) -- Seconds the columns are kept before being loaded
+            again (default 300)
+        coerce(bool) -- Convert values of another type, e.g. "10" for an
+            integer column, instead of rejecting the insert (default False)
+        """
+        self.ttl = ttl
+        self.coerce = coerce
+        self.column_types = {}
+        self.loaded_at = None
+        self._lock = None
+
+    @property
+    def expired(self):
+        """True when the columns must be loaded"""
+        return (self.loaded_at is None or
+                time.monotonic() - self.loaded_at >= self.ttl)
+
+    def update(self, columns):
+        """Replace the cached columns
+
+        Keyword arguments:
+        columns(dict) -- The decoded get_columns response
+        """
+        self.column_types = {
+            column['api-name']: column.get('type')
+            for column in columns.get('active') or ()
+            if 'api-name' in column}
+        self.loaded_at = time.monotonic()
+
+    def invalidate(self):
+        """Load the columns again before the next check"""
+        self.loaded_at = None
+
+    async def refresh(self, load_columns):
+        """Load the columns when expired. Concurrent inserts wait for a
+        single load.
+
+        Keyword arguments:
+        load_columns(coroutine function) -- Returns the decoded
+            get_columns response
+        """
+        if not self.expired:
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self.expired:
+                self.update(await load_columns())
+
+    def check(self, data):
+        """Check the value types of an insertion, converting mismatched
+        values in place when coerce is enabled
+
+        Keyword arguments:
+        data(dict) -- The insertion
+        """
+        validators.check_column_types(data, self.column_types, self.coerce)
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import asyncio
+
+
+class _Call(object):
+    __slots__ = ('task', 'waiters')
+
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight(object):
+    """Share one execution between concurrent calls with the same key.
+
+    The first caller starts the work in its own task and later callers with
+    the same key wait for that task. A caller being cancelled only stops
+    its own wait; the work is cancelled once every caller gave up on it.
+    """
+
+    def __init__(self):
+        self._calls = {}
+
+    def __len__(self):
+        return len(self._calls)
+
+    def __contains__(self, key):
+        return key in self._calls
+
+    async def do(self, key, func):
+        """Returns the result of func, shared with concurrent calls of the
+        same key
+
+        Keyword arguments:
+        key(hashable) -- Identifies equal calls
+        func(coroutine function) -- Called without arguments to start the
+            work when no call with the key is in flight
+        """
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(func()))
+            self._calls[key] = call
+            call.task.add_done_callback(
+                lambda task: self._forget(key, call))
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                self._forget(key, call)
+                call.task.cancel()
+
+    def _forget(self, key, call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
@@ -0,0 +1,282 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""HTTP transports used by the requester.
+
+A transport sends a request and returns its status and body bytes. The
+default AiohttpTransport keeps an aiohttp session with a pool of HTTP/1.1
+connections. HTTPXTransport uses httpx, which can multiplex every request
+in flight over one HTTP/2 connection, and FakeTransport answers requests
+in process, for tests.
+"""
+
+import asyncio
+import inspect
+import ssl
+import time
+
+import aiohttp
+import ujson
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+from .. import exceptions
+from .instrumentation import trace_config
+from ..utils.data_utils import is_encoded
+
+
+class PoolConfig(object):
+    """Connection pool settings used by the requester session"""
+
+    def __init__(self, limit=100, limit_per_host=0, keepalive_timeout=15,
+                 dns_cache_ttl=10, ssl_context=None):
+        """
+        Keyword arguments:
+        limit(int) -- Total number of simultaneous connections of the
+            pool, 0 means no limit. A client has a pool per key level, so
+            it can open up to three times the limit (default 100)
+        limit_per_host(int) -- Number of simultaneous connections to the
+            same host, 0 means no limit (default 0)
+        keepalive_timeout(float) -- Seconds an idle connection is kept
+            open to be reused (default 15)
+        dns_cache_ttl(int) -- Seconds a resolved address is cached, None
+            caches forever (default 10)
+        ssl_context(ssl.SSLContext) -- TLS context shared by every
+            connection, one is created when not informed (default None)
+        """
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self.ssl_context = ssl_context
+
+
+def build_ssl(use_ssl, pool_config):
+    """Returns the TLS setting reused by every connection of a pool"""
+    if not use_ssl:
+        return False
+    if pool_config.ssl_context is not None:
+        return pool_config.ssl_context
+    return ssl.create_default_context()
+
+
+class Transport(object):
+    """Sends the requests of a client. Subclass it and override request
+    and close."""
+
+    async def request(self, method, url, headers, data=None, event=None):
+        """Returns the status and body bytes of a request. Raises
+        ConnectionFailedException when the request couldn't be sent and
+        SlicingDiceHTTPError when the connection fails or times out after
+        it.
+
+        Keyword arguments:
+        method(str) -- The HTTP method
+        url(str) -- The request url
+        headers(Mapping) -- The request headers
+        data(str or bytes) -- The request body (default None)
+        event(RequestEvent) -- Receives the time spent, the status and the
+            bytes sent and received, when given (default None)
+        """
+        raise NotImplementedError
+
+    async def close(self):
+        """Closes every connection. The transport opens new ones when it
+        is used again."""
+
+
+class AiohttpTransport(Transport):
+    """HTTP/1.1 transport using an aiohttp session, with one connection
+    per request in flight"""
+
+    def __init__(self, use_ssl=True, timeout=60, pool_config=None,
+                 trace=False):
+        """
+        Keyword arguments:
+        use_ssl(bool) -- Verify the certificates of HTTPS requests
+            (default True)
+        timeout(float) -- Seconds to wait for each request (default 60)
+        pool_config(PoolConfig) -- Connection pool settings (default None)
+        trace(bool) -- Add the time spent acquiring a connection to the
+            event connection phase (default False)
+        """
+        self.timeout = timeout
+        self.pool_config = pool_config or PoolConfig()
+        self._ssl = build_ssl(use_ssl, self.pool_config)
+        # Connection acquisition is timed only when requests are traced
+        self._trace_configs = [trace_config()] if trace else None
+        self.session = None
+
+    def _get_session(self):
+        """Returns the client session, creating it inside the running loop
+        on first use"""
+        if self.session is None or self.session.closed:
+            pool_config = self.pool_config
+            connector = aiohttp.TCPConnector(
+                limit=pool_config.limit,
+                limit_per_host=pool_config.limit_per_host,
+                keepalive_timeout=pool_config.keepalive_timeout,
+                ttl_dns_cache=pool_config.dns_cache_ttl,
+                ssl=self._ssl)
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                trace_configs=self._trace_configs)
+        return self.session
+
+    async def close(self):
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
+
+    async def request(self, method, url, headers, data=None, event=None):
+        session = self._get_session()
+        if event is not None:
+            started = time.perf_counter()
+            connection = event.connection
+            event.bytes_sent += len(data) if data else 0
+        try:
+            async with session.request(method, url, data=data,
+                                       headers=headers,
+                                       trace_request_ctx=event) as resp:
+                body = await resp.read()
+                if event is not None:
+                    event.status = resp.status
+                    event.bytes_received += len(body)
+                return resp.status, body
+        except aiohttp.ClientConnectorError as e:
+            raise exceptions.ConnectionFailedException(e)
+        except aiohttp.ClientConnectionError as e:
+            raise exceptions.SlicingDiceHTTPError(e)
+        except asyncio.TimeoutError as e:
+            raise exceptions.SlicingDiceHTTPError(e)
+        finally:
+            if event is not None:
+                event.network += (time.perf_counter() - started -
+                                  (event.connection - connection))
+
+
+class HTTPXTransport(Transport):
+    """Transport using httpx, an optional dependency. With HTTP/2 every
+    request in flight to the API shares one connection, instead of one
+    connection each:
+
+        pip install 'httpx[http2]'
+    """
+
+    def __init__(self, use_ssl=True, timeout=60, pool_config=None,
+                 http2=True, http1=True):
+        """
+        Keyword arguments:
+        use_ssl(bool) -- Verify the certificates of HTTPS requests
+            (default True)
+        timeout(float) -- Seconds to wait for each request (default 60)
+        pool_config(PoolConfig) -- Connection pool settings, only limit,
+            keepalive_timeout and ssl_context apply (default None)
+        http2(bool) -- Negotiate HTTP/2 on HTTPS connections (default True)
+        http1(bool) -- Allow HTTP/1.1, False sends HTTP/2 without
+            negotiation, also on plain HTTP urls (default True)
+        """
+        if httpx is None:
+            raise ImportError(
+                "HTTPXTransport needs httpx, install it with: "
+                "pip install 'httpx[http2]'")
+        self.timeout = timeout
+        self.pool_config = pool_config or PoolConfig()
+        self.http2 = http2
+        self.http1 = http1
+        self._ssl = build_ssl(use_ssl, self.pool_config)
+        self.client = None
+
+    def _get_client(self):
+        """Returns the httpx client, creating it on first use"""
+        if self.client is None or self.client.is_closed:
+            pool_config = self.pool_config
+            self.client = httpx.AsyncClient(
+                http1=self.http1, http2=self.http2, verify=self._ssl,
+                timeout=self.timeout, limits=httpx.Limits(
+                    max_connections=pool_config.limit or None,
+                    keepalive_expiry=pool_config.keepalive_timeout))
+        return self.client
+
+    async def close(self):
+        if self.client is not None and not self.client.is_closed:
+            await self.client.aclose()
+        self.client = None
+
+    async def request(self, method, url, headers, data=None, event=None):
+        client = self._get_client()
+        if event is not None:
+            started = time.perf_counter()
+            event.bytes_sent += len(data) if data else 0
+        if is_encoded(data) and not isinstance(data, bytes):
+            # httpx streams other buffers as iterables of chunks
+            data = bytes(data)
+        try:
+            response = await client.request(method, url, content=data,
+                                            headers=headers)
+        except (httpx.ConnectError, httpx.ConnectTimeout,
+                httpx.PoolTimeout) as e:
+            raise exceptions.ConnectionFailedException(e)
+        except httpx.TransportError as e:
+            raise exceptions.SlicingDiceHTTPError(e)
+        finally:
+            if event is not None:
+                event.network += time.perf_counter() - started
+        body = response.content
+        if event is not None:
+            event.status = response.status_code
+            event.bytes_received += len(body)
+        return response.status_code, body
+
+
+class FakeTransport(Transport):
+    """Answers requests in process, without opening connections, and keeps
+    every request it receives:
+
+        transport = FakeTransport(lambda method, url, headers, data: (
+            200, {'status': 'success', 'count': 10}))
+        sd = SlicingDice(master_key='test', transport=transport)
+        ...
+        method, url, headers, data = transport.requests[0]
+    """
+
+    def __init__(self, handler=None):
+        """
+        Keyword arguments:
+        handler(callable) -- Called with (method, url, headers, data) of
+            each request, returns, or returns a coroutine returning, the
+            response status and body: bytes, str or an object encoded as
+            JSON. Defaults to a 200 {"status": "success"} response.
+        """
+        self.handler = handler or self._success
+        self.requests = []
+
+    @staticmethod
+    def _success(method, url, headers, data):
+        return 200, {'status': 'success'}
+
+    async def request(self, method, url, headers, data=None, event=None):
+        if event is not None:
+            started = time.perf_counter()
+            event.bytes_sent += len(data) if data else 0
+        self.requests.append((method, url, headers, data))
+        try:
+            response = self.handler(method, url, headers, data)
+            if inspect.isawaitable(response):
+                response = await response
+        finally:
+            if event is not None:
+                event.network += time.perf_counter() - started
+        status, body = response
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        elif not isinstance(body, bytes):
+            body = ujson.dumps(body).encode('utf-8')
+        if event is not None:
+            event.status = status
+            event.bytes_received += len(body)
+        return status, body
@@ -9,7 +9,10 @@ class SlicingDiceException(Exception):
         self.code = kwargs.pop('code', None)
         self.message = kwargs.pop('message', None)
         self.more_info = kwargs.pop('more-info', None)
-        super(SlicingDiceException, self).__init__(self, *args, **kwargs)
+        # HTTP status of the response holding the error, None when the
+        # request didn't get a response
+        self.status = kwargs.pop('status', None)
+        super(SlicingDiceException, self).__init__(*args)
 
     def __str__(self):
         return "SlicingDiceException(code={}, message={}, more_info={})".format(
@@ -18,40 +21,51 @@ class SlicingDiceException(Exception):
 
 class InternalException(SlicingDiceException):
     def __init__(self, *args, **kwargs):
-        super(InternalException, self).__init__(self, *args, **kwargs)
+        super(InternalException, self).__init__(*args, **kwargs)
 
 
 # Specific SlicingDice Exceptions
 
 class SlicingDiceHTTPError(SlicingDiceException):
     def __init__(self, *args, **kwargs):
-        super(SlicingDiceHTTPError, self).__init__(self, *args, **kwargs)
+        super(SlicingDiceHTTPError, self).__init__(*args, **kwargs)
+
+
+# The connection couldn't be established, so the request wasn't sent
+class ConnectionFailedException(SlicingDiceHTTPError):
+    def __init__(self, *args, **kwargs):
+        super(ConnectionFailedException, self).__init__(*args, **kwargs)
 
 
 class DemoUnavailableException(SlicingDiceException):
     def __init__(self, *args, **kwargs):
-        super(DemoUnavailableException, self).__init__(self, *args, **kwargs)
+        super(DemoUnavailableException, self).__init__(*args, **kwargs)
 
 
 class RequestRateLimitException(SlicingDiceException):
     def __init__(self, *args, **kwargs):
-        super(RequestRateLimitException, self).__init__(self, *args, **kwargs)
+        super(RequestRateLimitException, self).__init__(*args, **kwargs)
 
 
 class RequestBodySizeExceededException(SlicingDiceException):
     def __init__(self, *args, **kwargs):
-        super(RequestBodySizeExceededException, self).__init__(self, *args,
+        super(RequestBodySizeExceededException, self).__init__(*args,
                                                                **kwargs)
 
 
+class RequestTimeoutException(SlicingDiceException):
+    def __init__(self, *args, **kwargs):
+        super(RequestTimeoutException, self).__init__(*args, **kwargs)
+
+
 class IndexEntitiesLimitException(SlicingDiceException):
     def __init__(self, *args, **kwargs):
-        super(IndexEntitiesLimitException, self).__init__(self, *args, **kwargs)
+        super(IndexEntitiesLimitException, self).__init__(*args, **kwargs)
 
 
 class IndexColumnsLimitException(SlicingDiceException):
     def __init__(self, *args, **kwargs):
-        super(IndexColumnsLimitException, self).__init__(self, *args, **kwargs)
+        super(IndexColumnsLimitException, self).__init__(*args, **kwargs)
 
 
 # Validation exceptions
@@ -59,56 +73,56 @@ class IndexColumnsLimitException(SlicingDiceException):
 
 class MaxLimitException(SlicingDiceException):
     def __init__(self, *args, **kwargs):
-        super(MaxLimitException, self).__init__(self, *args, **kwargs)
+        super(MaxLimitException, self).__init__(*args, **kwargs)
 
 
 class InvalidQueryException(SlicingDiceException):
     def __init__(self, *args, **kwargs):
-        super(InvalidQueryException, self).__init__(self, *args, **kwargs)
+        super(InvalidQueryException, self).__init__(*args, **kwargs)
 
 
 class InvalidColumnTypeException(SlicingDiceException):
     def __init__(self, *args, **kwargs):
-        super(InvalidColumnTypeException, self).__init__(self, *args, **kwargs)
+        super(InvalidColumnTypeException, self).__init__(*args, **kwargs)
 
 
 class InvalidSlicingDiceKeysException(SlicingDiceException):
     def __init__(self, *args, **kwargs):
-        super(InvalidSlicingDiceKeysException, self).__init__(self, *args,
+        super(InvalidSlicingDiceKeysException, self).__init__(*args,
                                                               **kwargs)
 
 
 class InvalidQueryTypeException(SlicingDiceException):
     def __init__(self, *args, **kwargs):
-        super(InvalidQueryTypeException, self).__init__(self, *args,
+        super(InvalidQueryTypeException, self).__init__(*args,
                                                         **kwargs)
 
 
 class WrongTypeException(SlicingDiceException):
     def __init__(self, *args, **kwargs):
-        super(WrongTypeException, self).__init__(self, *args,
+        super(WrongTypeException, self).__init__(*args,
                                                  **kwargs)
 
 
 class InvalidInsertException(SlicingDiceException):
     def __init__(self, *args, **kwargs):
-        super(InvalidInsertException, self).__init__(self, *args,
+        super(InvalidInsertException, self).__init__(*args,
                                                      **kwargs)
 
 
 class InvalidColumnException(SlicingDiceException):
     def __init__(self, *args, **kwargs):
-        super(InvalidColumnException, self).__init__(self, *args,
+        super(InvalidColumnException, self).__init__(*args,
                                                      **kwargs)
 
 
 class InvalidColumnNameException(SlicingDiceException):
     def __init__(self, *args, **kwargs):
-        super(InvalidColumnNameException, self).__init__(self, *args,
+        super(InvalidColumnNameException, self).__init__(*args,
                                                          **kwargs)
 
 
 class InvalidColumnDescriptionException(SlicingDiceException):
     def __init__(self, *args, **kwargs):
-        super(InvalidColumnDescriptionException, self).__init__(self, *args,
+        super(InvalidColumnDescriptionException, self).__init__(*args,
                                                                 **kwargs)
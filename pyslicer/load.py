@@ -0,0 +1,492 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Load a large NDJSON or CSV file into Slicing Dice.
+
+The file is split into line aligned byte ranges processed by a pool of
+worker processes. Each worker parses, validates and serializes the entities
+of its ranges and sends them with its own SlicingDice client, so CPU bound
+work is spread across cores while each worker keeps several batches in
+flight. The byte span of every inserted batch is recorded in a checkpoint
+file and skipped when the load is run again, so an interrupted load resumes
+where it stopped without sending the inserted batches again.
+
+Usage:
+    $ SD_API_KEY=<write key> python -m pyslicer.load users.ndjson \\
+        --auto-create dimension,column --workers 4
+"""
+
+import argparse
+import asyncio
+import bisect
+import concurrent.futures
+import csv
+import glob
+import multiprocessing
+import os
+import signal
+import sys
+
+import ujson
+
+from .client import SlicingDice
+from .utils import validators
+
+DEFAULT_CHUNK_BYTES = 16 * 1024 * 1024
+
+_worker_loop = None
+_worker_client = None
+_worker_checkpoint = None
+_worker_stop = None
+
+
+def range_offsets(path, chunk_bytes, start=0):
+    """Returns (start, end) byte ranges of about chunk_bytes that begin and
+    end on line boundaries.
+
+    Keyword arguments:
+    path(str) -- Path of the file
+    chunk_bytes(int) -- Approximate size of each range
+    start(int) -- Offset of the first range (default 0)
+    """
+    size = os.path.getsize(path)
+    ranges = []
+    with open(path, 'rb') as records_file:
+        while start < size:
+            records_file.seek(min(start + chunk_bytes, size))
+            if records_file.tell() < size:
+                # Move the end to the start of the next line
+                records_file.readline()
+            end = records_file.tell()
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def read_range(path, start, end, id_column, fieldnames=None):
+    """Read (entity_id, columns) pairs of the lines in a byte range.
+
+    Keyword arguments:
+    path(str) -- Path of the file
+    start(int) -- Offset of the first line
+    end(int) -- Offset after the last line
+    id_column(str) -- Field holding the entity id
+    fieldnames(list) -- CSV header, None for NDJSON files
+    """
+    with open(path, 'rb') as records_file:
+        records_file.seek(start)
+        for _, line in _lines_until(records_file, end):
+            if not line.isspace():
+                yield parse_line(line, id_column, fieldnames)
+
+
+def parse_line(line, id_column, fieldnames=None):
+    """Returns the (entity_id, columns) pair of a NDJSON or CSV line.
+
+    Keyword arguments:
+    line(bytes) -- The line
+    id_column(str) -- Field holding the entity id
+    fieldnames(list) -- CSV header, None for NDJSON lines
+    """
+    if fieldnames is None:
+        columns = ujson.loads(line)
+        return columns.pop(id_column), columns
+    row = next(csv.DictReader([line.decode('utf-8')], fieldnames=fieldnames))
+    entity_id = row.pop(id_column)
+    return entity_id, {column: value for column, value in row.items()
+                       if value != ''}
+
+
+def _lines_until(records_file, end):
+    while records_file.tell() < end:
+        line_start = records_file.tell()
+        line = records_file.readline()
+        if not line:
+            return
+        yield line_start, line
+
+
+class Spans(object):
+    """Sorted, merged byte spans [start, end)"""
+
+    def __init__(self, spans=()):
+        self._starts = []
+        self._ends = []
+        for start, end in spans:
+            self.add(start, end)
+
+    def add(self, start, end):
+        """Add a span, merging it with the spans it touches"""
+        index = bisect.bisect_left(self._ends, start)
+        last = bisect.bisect_right(self._starts, end)
+        if index < last:
+            start = min(start, self._starts[index])
+            end = max(end, self._ends[last - 1])
+        self._starts[index:last] = [start]
+        self._ends[index:last] = [end]
+
+    def __contains__(self, offset):
+        index = bisect.bisect_right(self._starts, offset) - 1
+        return index >= 0 and offset < self._ends[index]
+
+    def covers(self, start, end):
+        """Check if a single span holds all of [start, end)"""
+        index = bisect.bisect_right(self._starts, start) - 1
+        return index >= 0 and end <= self._ends[index]
+
+    def within(self, start, end):
+        """Returns the spans overlapping [start, end)"""
+        first = bisect.bisect_right(self._ends, start)
+        last = bisect.bisect_left(self._starts, end)
+        return Spans(zip(self._starts[first:last], self._ends[first:last]))
+
+    def __iter__(self):
+        return iter(zip(self._starts, self._ends))
+
+    def __len__(self):
+        return len(self._starts)
+
+
+class Checkpoint(object):
+    """Byte spans of the batches already inserted, stored one JSON object
+    per line.
+
+    Workers append the batches they insert to part files next to the
+    checkpoint, one per process, as soon as each batch completes. The parts
+    are merged into the checkpoint when it is opened and by merge_parts.
+    """
+
+    def __init__(self, path, source, chunk_bytes):
+        """
+        Keyword arguments:
+        path(str) -- Path of the checkpoint file
+        source(str) -- Path of the file being loaded
+        chunk_bytes(int) -- Size used to split the file into ranges
+        """
+        self.path = path
+        self.completed = Spans()
+        header = {'source': os.path.abspath(source),
+                  'size': os.path.getsize(source),
+                  'chunk-bytes': chunk_bytes}
+        if os.path.exists(path):
+            with open(path) as checkpoint_file:
+                stored_header = ujson.loads(checkpoint_file.readline())
+                if stored_header != header:
+                    raise ValueError(
+                        "Checkpoint {} belongs to another load: {}".format(
+                            path, stored_header))
+                self._add_entries(checkpoint_file)
+            self._file = open(path, 'a')
+        else:
+            # Parts without a checkpoint belong to another load
+            for part_path in self._part_paths():
+                os.remove(part_path)
+            self._file = open(path, 'w')
+            write_entry(self._file, header)
+        self.merge_parts()
+
+    def _part_paths(self):
+        return glob.glob(glob.escape(self.path) + '.part-*')
+
+    def _add_entries(self, lines):
+        """Add the spans of checkpoint lines, returns their entries"""
+        entries = []
+        for line in lines:
+            try:
+                entry = ujson.loads(line)
+            except ValueError:
+                # The last line of a process killed while writing it
+                continue
+            self.completed.add(entry['start'], entry['end'])
+            entries.append(entry)
+        return entries
+
+    def merge_parts(self):
+        """Move the batches recorded in part files to the checkpoint"""
+        for part_path in self._part_paths():
+            with open(part_path) as part_file:
+                entries = self._add_entries(part_file)
+            for entry in entries:
+                self._file.write(ujson.dumps(entry) + '\n')
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            os.remove(part_path)
+
+    def close(self):
+        self._file.close()
+
+
+def part_path(checkpoint_path, pid):
+    """Returns the checkpoint part file of a worker process"""
+    return '{}.part-{}'.format(checkpoint_path, pid)
+
+
+def write_entry(checkpoint_file, entry):
+    """Append an entry to a checkpoint or part file, synced to disk"""
+    checkpoint_file.write(ujson.dumps(entry) + '\n')
+    checkpoint_file.flush()
+    os.fsync(checkpoint_file.fileno())
+
+
+def _init_worker(client_options, checkpoint_path, stop):
+    global _worker_loop, _worker_client, _worker_checkpoint, _worker_stop
+    # An interrupted load stops the workers through stop, once their
+    # batches in flight are recorded
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _worker_stop = stop
+    _worker_loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(_worker_loop)
+    _worker_client = SlicingDice(**client_options)
+    _worker_checkpoint = open(part_path(checkpoint_path, os.getpid()), 'a')
+
+
+def _load_range(path, start, end, id_column, fieldnames, auto_create,
+                batch_size, completed):
+    """Insert the entities of a byte range. Runs in a worker process and
+    returns the range with its insertion summary without batch results."""
+    return start, end, _worker_loop.run_until_complete(_insert_range(
+        path, start, end, id_column, fieldnames, auto_create, batch_size,
+        completed))
+
+
+async def _insert_range(path, start, end, id_column, fieldnames,
+                        auto_create, batch_size, completed):
+    """Send the lines of a byte range not in completed in batches, keeping
+    the client concurrency of batches in flight. Each batch is indexed by
+    the byte span of its lines and recorded in the worker part file as
+    soon as it is inserted. An entity id repeated in a batch starts a new
+    one, and lines that can't be parsed are reported and left out of every
+    span. When the load is interrupted no new batch is started."""
+    client = _worker_client
+    pending = set()
+    results = []
+    invalid = []
+
+    def collect(result):
+        if result['status'] == 'success':
+            span_start, span_end = result['batch']
+            write_entry(_worker_checkpoint, {
+                'start': span_start, 'end': span_end,
+                'inserted-entities': result.get('inserted-entities', 0)})
+        results.append(result)
+
+    async def send(span, batch):
+        if auto_create is not None:
+            batch['auto-create'] = auto_create
+        pending.add(asyncio.ensure_future(client._insert_batch(
+            (span, batch))))
+        while len(pending) >= client.concurrency:
+            done, _ = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED)
+            pending.difference_update(done)
+            for task in done:
+                collect(task.result())
+
+    try:
+        batch = {}
+        batch_start = start
+        with open(path, 'rb') as records_file:
+            records_file.seek(start)
+            for line_start, line in _lines_until(records_file, end):
+                if _worker_stop.is_set():
+                    batch = {}
+                    break
+                if line.isspace() or line_start in completed:
+                    continue
+                line_end = line_start + len(line)
+                try:
+                    entity_id, columns = parse_line(
+                        line, id_column, fieldnames)
+                except Exception as e:
+                    invalid.append('line at byte {}: {}: {}'.format(
+                        line_start, type(e).__name__, e))
+                    if batch:
+                        await send((batch_start, line_start), batch)
+                        batch = {}
+                    batch_start = line_end
+                    continue
+                if entity_id in batch:
+                    await send((batch_start, line_start), batch)
+                    batch = {}
+                    batch_start = line_start
+                batch[entity_id] = columns
+                if len(batch) == batch_size:
+                    await send((batch_start, line_end), batch)
+                    batch = {}
+                    batch_start = line_end
+        if batch:
+            await send((batch_start, end), batch)
+        elif batch_start < end and not _worker_stop.is_set():
+            # Blank or already inserted lines after the last batch
+            collect({'batch': (batch_start, end), 'entities': 0,
+                     'status': 'success', 'inserted-entities': 0})
+        while pending:
+            done, _ = await asyncio.wait(pending)
+            pending.difference_update(done)
+            for task in done:
+                collect(task.result())
+    finally:
+        for task in pending:
+            task.cancel()
+
+    summary = client._summarize_batches(results)
+    errors = [batch['error'] for batch in summary['batches']
+              if batch['status'] != 'success' and 'error' in batch]
+    status = summary['status'] if results else 'success'
+    if invalid:
+        status = 'partial' if summary['inserted-entities'] else 'error'
+    return {
+        'status': status,
+        'inserted-entities': summary['inserted-entities'],
+        'failed-batches': summary['failed-batches'],
+        'invalid-lines': len(invalid),
+        'errors': (invalid + errors)[:10]
+    }
+
+
+def load(path, client_options, workers=None, checkpoint_path=None,
+         chunk_bytes=DEFAULT_CHUNK_BYTES, id_column='entity-id',
+         auto_create=None, batch_size=validators.MAX_INSERTION_BATCH_SIZE,
+         progress=None):
+    """Load a NDJSON or CSV file using a pool of worker processes. The
+    byte span of each inserted batch is checkpointed, so the next run only
+    sends the lines of failed batches, the lines that couldn't be parsed
+    and the ranges whose worker failed. Returns the totals of inserted
+    entities, failed batches, invalid lines and failed ranges.
+
+    Keyword arguments:
+    path(str) -- Path of the file, files ending with '.csv' are read as CSV
+    client_options(dict) -- Keyword arguments of each worker SlicingDice
+    workers(int) -- Number of worker processes, defaults to the CPU count
+    checkpoint_path(str) -- Checkpoint file, defaults to path +
+        '.checkpoint'
+    chunk_bytes(int) -- Approximate size of each range
+    id_column(str) -- Field holding the entity id (default 'entity-id')
+    auto_create(list) -- The 'auto-create' value sent with each batch
+    batch_size(int) -- Maximum number of entities per batch
+    progress(callable) -- Called with (start, end, summary) when a range
+        completes or fails (default None)
+    """
+    fieldnames = None
+    first_offset = 0
+    if path.lower().endswith('.csv'):
+        with open(path, 'rb') as records_file:
+            header = records_file.readline()
+            first_offset = records_file.tell()
+        fieldnames = next(csv.reader([header.decode('utf-8')]))
+
+    checkpoint = Checkpoint(
+        checkpoint_path or path + '.checkpoint', path, chunk_bytes)
+    ranges = range_offsets(path, chunk_bytes, first_offset)
+    pending = [(start, end) for start, end in ranges
+               if not checkpoint.completed.covers(start, end)]
+    totals = {'inserted-entities': 0, 'failed-batches': 0,
+              'invalid-lines': 0, 'failed-ranges': 0,
+              'ranges': len(pending),
+              'skipped-ranges': len(ranges) - len(pending)}
+    stop = multiprocessing.Event()
+    try:
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_worker,
+                initargs=(client_options, checkpoint.path,
+                          stop)) as executor:
+            futures = {executor.submit(
+                _load_range, path, start, end, id_column, fieldnames,
+                auto_create, batch_size,
+                checkpoint.completed.within(start, end)): (start, end)
+                for start, end in pending}
+            try:
+                for future in concurrent.futures.as_completed(futures):
+                    start, end = futures[future]
+                    try:
+                        _, _, summary = future.result()
+                    except Exception as e:
+                        totals['failed-ranges'] += 1
+                        summary = {
+                            'status': 'error',
+                            'inserted-entities': 0,
+                            'failed-batches': 0,
+                            'invalid-lines': 0,
+                            'errors': ['{}: {}'.format(type(e).__name__, e)]
+                        }
+                    totals['inserted-entities'] += (
+                        summary['inserted-entities'])
+                    totals['failed-batches'] += summary['failed-batches']
+                    totals['invalid-lines'] += summary['invalid-lines']
+                    if progress is not None:
+                        progress(start, end, summary)
+            except KeyboardInterrupt:
+                # Drop the ranges not started and wait for the workers to
+                # record the batches in flight
+                stop.set()
+                if sys.version_info >= (3, 9):
+                    executor.shutdown(wait=False, cancel_futures=True)
+                else:
+                    for future in futures:
+                        future.cancel()
+                raise
+    finally:
+        checkpoint.merge_parts()
+        checkpoint.close()
+    return totals
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Load a NDJSON or CSV file into SlicingDice.")
+    parser.add_argument('path', help='NDJSON or CSV (.csv) file, one '
+                                     'entity per line')
+    parser.add_argument('--key', default=os.environ.get('SD_API_KEY'),
+                        help='write or master key (default $SD_API_KEY)')
+    parser.add_argument('--master', action='store_true',
+                        help='the key is a master key')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='worker processes (default CPU count)')
+    parser.add_argument('--concurrency', type=int, default=10,
+                        help='batches in flight per worker (default 10)')
+    parser.add_argument('--batch-size', type=int,
+                        default=validators.MAX_INSERTION_BATCH_SIZE,
+                        help='entities per batch (default 1000)')
+    parser.add_argument('--chunk-bytes', type=int,
+                        default=DEFAULT_CHUNK_BYTES,
+                        help='bytes of the file per worker task')
+    parser.add_argument('--id-column', default='entity-id',
+                        help="field holding the entity id "
+                             "(default 'entity-id')")
+    parser.add_argument('--auto-create', default=None,
+                        help='comma separated auto-create value, e.g. '
+                             'dimension,column')
+    parser.add_argument('--checkpoint', default=None,
+                        help='checkpoint file (default <path>.checkpoint)')
+    args = parser.parse_args(argv)
+
+    if not args.key:
+        parser.error('a key is required, use --key or set SD_API_KEY')
+    key_name = 'master_key' if args.master else 'write_key'
+    client_options = {key_name: args.key, 'concurrency': args.concurrency}
+    auto_create = args.auto_create.split(',') if args.auto_create else None
+
+    def progress(start, end, summary):
+        print('bytes {}-{}: {} entities, {} failed batches, {} invalid '
+              'lines{}'.format(
+                  start, end, summary['inserted-entities'],
+                  summary['failed-batches'], summary['invalid-lines'],
+                  ''.join('\n  ' + error for error in summary['errors'])))
+
+    totals = load(args.path, client_options, workers=args.workers,
+                  checkpoint_path=args.checkpoint,
+                  chunk_bytes=args.chunk_bytes, id_column=args.id_column,
+                  auto_create=auto_create, batch_size=args.batch_size,
+                  progress=progress)
+    print('Inserted {} entities, {} failed batches, {} invalid lines, {} '
+          'failed ranges, {} ranges skipped by the checkpoint'.format(
+              totals['inserted-entities'], totals['failed-batches'],
+              totals['invalid-lines'], totals['failed-ranges'],
+              totals['skipped-ranges']))
+    failed = (totals['failed-batches'] + totals['invalid-lines'] +
+              totals['failed-ranges'])
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Result objects returned when the client uses the 'object' result mode.
+
+The response body is kept as received and only decoded on the first access
+to its content, so forwarding `raw` never pays for parsing.
+"""
+
+import ujson
+
+_NOT_DECODED = object()
+
+
+class Result(object):
+    """A SlicingDice API response"""
+    __slots__ = ('raw', '_json')
+
+    def __init__(self, raw):
+        """
+        Keyword arguments:
+        raw(bytes) -- The response body
+        """
+        self.raw = raw
+        self._json = _NOT_DECODED
+
+    @property
+    def json(self):
+        """The decoded response body"""
+        if self._json is _NOT_DECODED:
+            self._json = ujson.loads(self.raw)
+        return self._json
+
+    @property
+    def text(self):
+        """The response body as a string"""
+        return self.raw.decode('utf-8')
+
+    @property
+    def status(self):
+        return self.json.get('status')
+
+    @property
+    def took(self):
+        return self.json.get('took')
+
+    def get(self, key, default=None):
+        return self.json.get(key, default)
+
+    def __getitem__(self, key):
+        return self.json[key]
+
+    def __contains__(self, key):
+        return key in self.json
+
+    def __repr__(self):
+        return '{}({!r})'.format(type(self).__name__, self.raw)
+
+
+class CountResult(Result):
+    """Result of count entity and count event queries"""
+    __slots__ = ()
+
+    @property
+    def counts(self):
+        """Dictionary mapping each query name to its count"""
+        return self.json['result']
+
+
+class TopValuesResult(Result):
+    """Result of top values queries"""
+    __slots__ = ()
+
+    @property
+    def values(self):
+        """Dictionary mapping each query name to its top values by column"""
+        return self.json['result']
+
+
+class AggregationResult(Result):
+    """Result of aggregation queries"""
+    __slots__ = ()
+
+    @property
+    def result(self):
+        return self.json['result']
+
+
+class DataExtractionResult(Result):
+    """A page of a data extraction result or score query"""
+    __slots__ = ()
+
+    @property
+    def data(self):
+        return self.json['data']
+
+    @property
+    def page(self):
+        return self.json.get('page')
+
+    @property
+    def next_page(self):
+        """Token of the next page, None on the last page"""
+        return self.json.get('next-page')
@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Synchronous interface to the Slicing Dice API.
+
+Calls are run on one event loop per process, kept in a background thread,
+so every SyncSlicingDice shares long-lived sessions and pooled connections
+instead of creating a loop, a session and a TLS handshake per call.
+"""
+
+import asyncio
+import functools
+import inspect
+import os
+import threading
+
+from .client import SlicingDice
+
+_loop_lock = threading.Lock()
+_loop = None
+_loop_thread = None
+_loop_pid = None
+# Loop and clients inherited from the parent process. Their sockets are
+# registered in the epoll instance the child shares with the parent, so
+# they are kept alive: closing those sockets when they are collected would
+# unregister them for the parent too.
+_inherited = []
+
+
+def _detach_parent_loop():
+    """Drop the loop inherited from the parent process, whose thread
+    doesn't exist in the child"""
+    global _loop, _loop_thread
+    if _loop is not None and _loop_pid != os.getpid():
+        _inherited.append(_loop)
+        _loop = None
+        _loop_thread = None
+
+
+def _after_fork_in_child():
+    global _loop_lock
+    # Another thread of the parent may have held the lock during the fork
+    _loop_lock = threading.Lock()
+    _detach_parent_loop()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def _background_loop():
+    """Returns the event loop of the current process, starting its thread
+    on first use and after a fork"""
+    global _loop, _loop_thread, _loop_pid
+    with _loop_lock:
+        _detach_parent_loop()
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            _loop_thread = threading.Thread(
+                target=_loop.run_forever, name='pyslicer-event-loop',
+                daemon=True)
+            _loop_thread.start()
+            _loop_pid = os.getpid()
+        return _loop
+
+
+class SyncSlicingDice(object):
+    """Synchronous SlicingDice client, safe to share between threads.
+
+    It accepts the same arguments as SlicingDice and exposes every
+    SlicingDice method as a blocking call:
+
+        sd = SyncSlicingDice(master_key='my-token')
+        print(sd.count_entity(query_json))
+
+    After a fork the child process uses its own loop and a new SlicingDice
+    built with the same arguments, so it never waits on the parent loop or
+    reuses the parent connections. The parent client is left open in the
+    child, so its connections keep working in the parent. A transport given
+    as argument is shared with the new client.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._args = args
+        self._kwargs = kwargs
+        self._pid = os.getpid()
+        self._client = SlicingDice(*args, **kwargs)
+
+    def _get_client(self):
+        """Returns the wrapped client, rebuilding it in a forked child"""
+        if self._pid != os.getpid():
+            _inherited.append(self._client)
+            self._client = SlicingDice(*self._args, **self._kwargs)
+            self._pid = os.getpid()
+        return self._client
+
+    def _run(self, coroutine):
+        """Run a coroutine on the background loop and wait for its result
+
+        Keyword arguments:
+        coroutine -- The coroutine to run
+        """
+        loop = _background_loop()
+        if threading.current_thread() is _loop_thread:
+            coroutine.close()
+            raise RuntimeError(
+                "SyncSlicingDice can't be called from its own event loop, "
+                "use SlicingDice instead.")
+        return asyncio.run_coroutine_threadsafe(
+            coroutine, loop).result()
+
+    def __getattr__(self, name):
+        attribute = getattr(self._get_client(), name)
+        if not inspect.iscoroutinefunction(attribute):
+            return attribute
+
+        @functools.wraps(attribute)
+        def method(*args, **kwargs):
+            return self._run(attribute(*args, **kwargs))
+        return method
+
+    def iter_result(self, query, prefetch=1, timeout=None, deadline=None):
+        """Iterate over every record of a data extraction result. Returns a
+        generator, pages are prefetched by the background loop.
+
+        Keyword arguments:
+        query -- A dictionary query
+        prefetch -- Number of pages fetched ahead (default 1)
+        timeout -- Seconds to fetch every page (default None)
+        deadline -- time.monotonic() value by which every page must be
+            fetched (default None)
+        """
+        return self._iterate(self._get_client().iter_result(
+            query, prefetch, timeout, deadline))
+
+    def iter_score(self, query, prefetch=1, timeout=None, deadline=None):
+        """Iterate over every record of a data extraction score. Returns a
+        generator, pages are prefetched by the background loop.
+
+        Keyword arguments:
+        query -- A dictionary query
+        prefetch -- Number of pages fetched ahead (default 1)
+        timeout -- Seconds to fetch every page (default None)
+        deadline -- time.monotonic() value by which every page must be
+            fetched (default None)
+        """
+        return self._iterate(self._get_client().iter_score(
+            query, prefetch, timeout, deadline))
+
+    def _iterate(self, records):
+        async def next_record():
+            return await records.__anext__()
+
+        async def close_records():
+            await records.aclose()
+
+        try:
+            while True:
+                try:
+                    yield self._run(next_record())
+                except StopAsyncIteration:
+                    return
+        finally:
+            self._run(close_records())
+
+    def close(self):
+        """Close the HTTP session and release every pooled connection"""
+        self._run(self._get_client().close())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
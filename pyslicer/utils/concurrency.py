@@ -0,0 +1,34 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import asyncio
+
+
+async def bounded_map(func, items, concurrency):
+    """Await func for every item keeping at most `concurrency` calls in
+    flight. Returns the results in the same order as items.
+
+    Items are pulled lazily, so only `concurrency` items are held in memory
+    at once. If a call raises, the remaining calls are cancelled.
+
+    Keyword arguments:
+    func(coroutine function) -- Called with each item
+    items(iterable) -- Items to process
+    concurrency(int) -- Maximum number of simultaneous calls
+    """
+    pending = enumerate(items)
+    results = {}
+
+    async def worker():
+        for index, item in pending:
+            results[index] = await func(item)
+
+    workers = [asyncio.ensure_future(worker())
+               for _ in range(max(1, concurrency))]
+    try:
+        await asyncio.gather(*workers)
+    except BaseException:
+        for task in workers:
+            task.cancel()
+        raise
+    return [results[index] for index in range(len(results))]
@@ -1,6 +1,10 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import csv
+
+import ujson
+
 
 def is_dict_empty(dictionary):
     """Validate if a dictionary is empty or no. Returns a boolean value.
@@ -18,3 +22,96 @@ def is_str_empty(string):
     string(str) -- A string to analyze
     """
     return string.isspace() or not string
+
+
+def is_encoded(data):
+    """Check if a payload is already encoded JSON. Returns a boolean value.
+
+    Keyword arguments:
+    data -- A query, an insertion or its encoded JSON
+    """
+    return isinstance(data, (bytes, bytearray, memoryview))
+
+
+def chunk_insertion(entities, batch_size, auto_create=None):
+    """Split entities into insertion batches. Returns a generator of dicts.
+    An entity id already in the current batch starts a new batch, so every
+    record is sent instead of overwriting the previous record of the id.
+
+    Keyword arguments:
+    entities(iterable) -- (entity_id, columns) pairs to insert
+    batch_size(int) -- Maximum number of entities in each batch
+    auto_create(list) -- Value for the 'auto-create' key of each batch
+        (default None)
+    """
+    batch = {}
+    for entity_id, columns in entities:
+        if entity_id in batch:
+            if auto_create is not None:
+                batch['auto-create'] = auto_create
+            yield batch
+            batch = {}
+        batch[entity_id] = columns
+        if len(batch) == batch_size:
+            if auto_create is not None:
+                batch['auto-create'] = auto_create
+            yield batch
+            batch = {}
+    if batch:
+        if auto_create is not None:
+            batch['auto-create'] = auto_create
+        yield batch
+
+
+def read_records(path, id_column='entity-id'):
+    """Read (entity_id, columns) pairs from a NDJSON or CSV file, one entity
+    per line. Files ending with '.csv' are read as CSV, any other as NDJSON.
+    Returns a generator, so the file is never fully loaded in memory.
+
+    Keyword arguments:
+    path(str) -- Path of the file
+    id_column(str) -- Field holding the entity id (default 'entity-id')
+    """
+    if path.lower().endswith('.csv'):
+        return _read_csv_records(path, id_column)
+    return _read_ndjson_records(path, id_column)
+
+
+def _read_ndjson_records(path, id_column):
+    with open(path, encoding='utf-8') as records_file:
+        for line in records_file:
+            if line.isspace():
+                continue
+            columns = ujson.loads(line)
+            yield columns.pop(id_column), columns
+
+
+def _read_csv_records(path, id_column):
+    with open(path, encoding='utf-8', newline='') as records_file:
+        for row in csv.DictReader(records_file):
+            entity_id = row.pop(id_column)
+            # Empty cells mean the column has no value for this entity
+            yield entity_id, {column: value for column, value in row.items()
+                              if value != ''}
+
+
+def split_queries(query, max_size):
+    """Split a request with many named queries into requests with up to
+    max_size queries each. The 'bypass-cache' parameter is kept in every
+    request. Returns a list of requests.
+
+    Keyword arguments:
+    query(dict or list) -- A dict of named queries or a list of queries
+    max_size(int) -- Maximum number of queries per request
+    """
+    if isinstance(query, list):
+        return [query[start:start + max_size]
+                for start in range(0, len(query), max_size)]
+    names = [name for name in query if name != 'bypass-cache']
+    requests = []
+    for start in range(0, len(names), max_size):
+        request = {name: query[name] for name in names[start:start + max_size]}
+        if 'bypass-cache' in query:
+            request['bypass-cache'] = query['bypass-cache']
+        requests.append(request)
+    return requests
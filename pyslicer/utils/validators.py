@@ -9,8 +9,195 @@ from pyslicer.utils.data_utils import is_str_empty
 
 MAX_QUERY_SIZE = 10
 
+MAX_TOP_VALUES_QUERY_SIZE = 5
+
 MAX_INSERTION_BATCH_SIZE = 1000
 
+MAX_EXISTS_IDS_SIZE = 100
+
+# Validation levels: 'full' walks every nested value, 'structural' only
+# checks the request shape and API limits and 'off' skips validation
+VALIDATION_FULL = 'full'
+VALIDATION_STRUCTURAL = 'structural'
+VALIDATION_OFF = 'off'
+
+VALIDATION_LEVELS = (VALIDATION_FULL, VALIDATION_STRUCTURAL, VALIDATION_OFF)
+
+_SCALAR_TYPES = (int, float, bool)
+
+
+def check_values(data):
+    """Check in a single iterative pass that no nested dict or list is
+    empty and that no value is None or an empty string.
+
+    Keyword arguments:
+    data(dict or list) -- The query or insertion to check
+    """
+    if not data:
+        raise exceptions.InvalidQueryException(
+            "This query has invalid keys or values.")
+    if isinstance(data, list):
+        # Queries sent as a list are checked through their 'query' member
+        pending = [item.get('query') if isinstance(item, dict) else item
+                   for item in data]
+    else:
+        pending = list(data.values())
+    pop = pending.pop
+    extend = pending.extend
+    while pending:
+        value = pop()
+        value_type = type(value)
+        if value_type is dict:
+            if value:
+                extend(value.values())
+                continue
+        elif value_type is list:
+            if value:
+                extend(value)
+                continue
+        elif value_type is str:
+            if value:
+                continue
+        elif value_type in _SCALAR_TYPES:
+            continue
+        elif isinstance(value, dict):
+            if value:
+                extend(value.values())
+                continue
+        elif isinstance(value, list):
+            if value:
+                extend(value)
+                continue
+        elif value is not None and value != "":
+            continue
+        raise exceptions.InvalidQueryException(
+            "This query has invalid keys or values.")
+
+
+def check_encoded(data, openers=b'{'):
+    """Check that a pre-encoded payload holds a non empty JSON object or
+    array. Only the ends of the payload are read, the JSON isn't decoded.
+
+    Keyword arguments:
+    data(bytes or memoryview) -- The encoded query or insertion
+    openers(bytes) -- Characters the payload may start with (default b'{')
+    """
+    head = bytes(data[:64]).lstrip()
+    tail = bytes(data[-64:]).rstrip()
+    opener = head[:1]
+    closer = b'}' if opener == b'{' else b']'
+    if (not opener or opener not in openers or tail[-1:] != closer or
+            head[1:].lstrip()[:1] == closer):
+        raise exceptions.InvalidQueryException(
+            "This query has invalid keys or values.")
+
+
+def _to_integer(value):
+    if isinstance(value, str):
+        return int(value)
+    if type(value) is float and value.is_integer():
+        return int(value)
+    raise ValueError(value)
+
+
+def _to_decimal(value):
+    if type(value) is bool:
+        raise ValueError(value)
+    return float(value)
+
+
+def _to_string(value):
+    if type(value) not in (int, float):
+        raise ValueError(value)
+    return str(value)
+
+
+def _to_boolean(value):
+    if value in ('true', 'false'):
+        return value == 'true'
+    raise ValueError(value)
+
+
+# Python types accepted by each column type and the function converting
+# other values when coercion is enabled
+COLUMN_VALUE_TYPES = {
+    'unique-id': ((str,), _to_string),
+    'string': ((str,), _to_string),
+    'enumerated': ((str,), _to_string),
+    'date': ((str,), None),
+    'datetime': ((str,), None),
+    'integer': ((int,), _to_integer),
+    'decimal': ((int, float), _to_decimal),
+    'boolean': ((bool,), _to_boolean),
+    'string-event': ((str,), _to_string),
+    'integer-event': ((int,), _to_integer),
+    'decimal-event': ((int, float), _to_decimal),
+}
+
+# Entity keys that are insertion parameters instead of columns
+ENTITY_PARAMETERS = ('dimension',)
+
+
+def _check_value(value, column_type, coerce, column, entity_id):
+    """Returns the value of a column, converted when coerce is true"""
+    accepted, convert = COLUMN_VALUE_TYPES[column_type]
+    if type(value) in accepted:
+        return value
+    if coerce and convert is not None:
+        try:
+            return convert(value)
+        except (TypeError, ValueError):
+            pass
+    raise exceptions.WrongTypeException(
+        "The value {!r} of column '{}' in entity '{}' should be of type "
+        "'{}'.".format(value, column, entity_id, column_type))
+
+
+def check_column_types(data, column_types, coerce=False):
+    """Check the value types of an insertion against the database columns.
+    Values of another type are converted in place when coerce is true and
+    the conversion is lossless.
+
+    Keyword arguments:
+    data(dict) -- The insertion
+    column_types(dict) -- Column type by column api-name
+    coerce(bool) -- Convert mismatched values, e.g. "10" for an integer
+        column, instead of rejecting them (default False)
+    """
+    allow_unknown = 'column' in (data.get('auto-create') or ())
+    for entity_id, columns in data.items():
+        if entity_id == 'auto-create':
+            continue
+        for column, value in columns.items():
+            column_type = column_types.get(column)
+            if column_type not in COLUMN_VALUE_TYPES:
+                if (column_type is not None or allow_unknown or
+                        column in ENTITY_PARAMETERS):
+                    continue
+                raise exceptions.InvalidColumnException(
+                    "The column '{}' in entity '{}' doesn't exist, use "
+                    "'auto-create' to create it.".format(column, entity_id))
+            is_event = column_type.endswith('-event')
+            values = value if isinstance(value, list) else [value]
+            for index, item in enumerate(values):
+                if is_event:
+                    if not isinstance(item, dict) or 'value' not in item:
+                        raise exceptions.WrongTypeException(
+                            "The values of event column '{}' in entity '{}' "
+                            "should have 'value' and 'date'.".format(
+                                column, entity_id))
+                    item['value'] = _check_value(
+                        item['value'], column_type, coerce, column,
+                        entity_id)
+                    continue
+                checked = _check_value(
+                    item, column_type, coerce, column, entity_id)
+                if checked is not item:
+                    if values is value:
+                        value[index] = checked
+                    else:
+                        columns[column] = checked
+
 
 class SDBaseValidator(object):
     """Base column, query and insertion validator."""
@@ -46,12 +233,13 @@ class SDBaseValidator(object):
         for dictionary_value in dictionary_list:
             self.check_dictionary_value(dictionary_value)
 
-    def __init__(self, dictionary):
+    def __init__(self, dictionary, level=VALIDATION_FULL):
         if not dictionary:
             raise exceptions.InvalidQueryException(
                 "This query has invalid keys or values.")
 
-        self.check_dictionary(dictionary)
+        if level == VALIDATION_FULL:
+            check_values(dictionary)
 
         self.data = dictionary
 
@@ -93,12 +281,12 @@ class SavedQueryValidator(SDBaseValidator):
 
 
 class QueryCountValidator(SDBaseValidator):
-    def __init__(self, queries):
+    def __init__(self, queries, level=VALIDATION_FULL):
         """
         Parameters:
             queries(dict) -- A dict query
         """
-        super(QueryCountValidator, self).__init__(queries)
+        super(QueryCountValidator, self).__init__(queries, level)
 
     def validator(self):
         """
@@ -118,12 +306,12 @@ class QueryCountValidator(SDBaseValidator):
 
 
 class QueryValidator(SDBaseValidator):
-    def __init__(self, queries):
+    def __init__(self, queries, level=VALIDATION_FULL):
         """
         Parameters:
             queries(dict) -- A dict query
         """
-        super(QueryValidator, self).__init__(queries)
+        super(QueryValidator, self).__init__(queries, level)
 
     def exceeds_queries_limit(self):
         """Check if query exceeds the limit of 5 queries per request
@@ -132,7 +320,13 @@ class QueryValidator(SDBaseValidator):
             true if exceeds the limit
             false otherwise
         """
-        if len(self.data) > 5:
+        query_size = len(self.data)
+
+        # bypass-cache property should not be considered as query
+        if "bypass-cache" in self.data:
+            query_size -= 1
+
+        if query_size > MAX_TOP_VALUES_QUERY_SIZE:
             return True
         return False
 
@@ -143,6 +337,8 @@ class QueryValidator(SDBaseValidator):
             false if don't exceeds the limit
         """
         for key, value in six.iteritems(self.data):
+            if key == "bypass-cache":
+                continue
             if len(value) > 6:
                 raise exceptions.MaxLimitException(
                     "The query '{0}' exceeds the limit of columns "
@@ -160,6 +356,8 @@ class QueryValidator(SDBaseValidator):
             false if don't exceeds the limit
         """
         for key, value in six.iteritems(self.data):
+            if key == "bypass-cache":
+                continue
             if "contains" in value and len(value['contains']) > 5:
                 raise exceptions.MaxLimitException(
                     "The query '{0}' exceeds the limit of contains "
@@ -176,12 +374,12 @@ class QueryValidator(SDBaseValidator):
 
 
 class QueryDataExtractionValidator(SDBaseValidator):
-    def __init__(self, queries):
+    def __init__(self, queries, level=VALIDATION_FULL):
         """
         Parameters:
             queries(dict) -- A dict query
         """
-        super(QueryDataExtractionValidator, self).__init__(queries)
+        super(QueryDataExtractionValidator, self).__init__(queries, level)
 
     def _valid_keys(self):
         """Validate a data extraction query
@@ -213,12 +411,12 @@ class QueryDataExtractionValidator(SDBaseValidator):
 
 
 class InsertValidator(SDBaseValidator):
-    def __init__(self, dictionary_to_insert):
+    def __init__(self, dictionary_to_insert, level=VALIDATION_FULL):
         """
         Parameters:
             dictionary_to_insert(dict) -- A dict query
         """
-        super(InsertValidator, self).__init__(dictionary_to_insert)
+        super(InsertValidator, self).__init__(dictionary_to_insert, level)
 
     def _has_empty_column(self):
         """Check empty columns in dictionary
@@ -230,9 +428,7 @@ class InsertValidator(SDBaseValidator):
             # "my-entity": {"year": 2016}
             # It can also be a parameter, such as "auto-create":
             # "auto-create": ["dimension", "column"]
-            if not isinstance(
-                    value, (dict, list)) or value is None or len(
-                        str(value)) == 0:
+            if not isinstance(value, (dict, list)):
                 raise exceptions.WrongTypeException(
                     "The value for an id should be a dictionary")
         return False
@@ -13,7 +13,8 @@ setup(
     author_email="help@slicingdice.com",
     description="Official Python 3 client for SlicingDice, Data Warehouse and "
                 "Analytics Database as a Service.",
-    install_requires=["aiohttp", "six", "ujson"],
+    python_requires=">=3.6",
+    install_requires=["aiohttp>=3.3", "six", "ujson"],
     license="BSD",
     keywords="slicingdice slicing dice data analysis analytics database",
     packages=[
@@ -24,7 +25,7 @@ setup(
     package_dir={'pyslicer': 'pyslicer'},
     long_description=read('README.md'),
     classifiers=[
-        "Programming Language :: Python :: 3.5",
+        "Programming Language :: Python :: 3.6",
         "Topic :: Scientific/Engineering :: Information Analysis",
     ],
 )
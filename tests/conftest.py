@@ -0,0 +1,14 @@
+import asyncio
+
+import pytest
+
+
+@pytest.fixture
+def run():
+    """Returns a function running a coroutine to completion on a new event
+    loop, closed after the test"""
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    yield loop.run_until_complete
+    loop.close()
+    asyncio.set_event_loop(None)
@@ -0,0 +1,54 @@
+import ujson
+
+from pyslicer import FakeTransport, SlicingDice
+from pyslicer.utils.data_utils import chunk_insertion
+
+
+def insert_handler(method, url, headers, data):
+    entities = [key for key in ujson.loads(data) if key != 'auto-create']
+    return 200, {'status': 'success', 'inserted-entities': len(entities)}
+
+
+def sent_batches(transport):
+    return [ujson.loads(data) for _, _, _, data in transport.requests]
+
+
+def test_repeated_entity_id_starts_a_new_batch():
+    records = [('a', {'x': 1}), ('a', {'x': 2}), ('b', {'x': 3})]
+    assert list(chunk_insertion(records, 2, ['column'])) == [
+        {'a': {'x': 1}, 'auto-create': ['column']},
+        {'a': {'x': 2}, 'b': {'x': 3}, 'auto-create': ['column']}]
+
+
+def test_insert_many_sends_every_record_of_a_repeated_id(run):
+    async def main():
+        transport = FakeTransport(insert_handler)
+        client = SlicingDice(write_key='W', transport=transport)
+        summary = await client.insert_many(
+            [('a', {'x': 1}), ('a', {'x': 2}), ('b', {'x': 3})],
+            batch_size=2)
+        assert sent_batches(transport) == [
+            {'a': {'x': 1}}, {'a': {'x': 2}, 'b': {'x': 3}}]
+        assert summary['status'] == 'success'
+        assert summary['entities'] == 3
+        assert summary['inserted-entities'] == 3
+        assert [batch['entities'] for batch in summary['batches']] == [1, 2]
+
+    run(main())
+
+
+def test_insert_stream_sends_every_record_of_a_repeated_id(run):
+    async def records():
+        for record in [('a', {'x': 1}), ('a', {'x': 2}), ('b', {'x': 3})]:
+            yield record
+
+    async def main():
+        transport = FakeTransport(insert_handler)
+        client = SlicingDice(write_key='W', transport=transport)
+        summary = await client.insert_stream(records(), batch_size=2,
+                                             concurrency=1)
+        assert sent_batches(transport) == [
+            {'a': {'x': 1}}, {'a': {'x': 2}, 'b': {'x': 3}}]
+        assert summary['entities'] == 3
+
+    run(main())
@@ -0,0 +1,84 @@
+import asyncio
+
+import ujson
+
+from pyslicer import FakeTransport, ResultCache, SlicingDice
+from pyslicer.url_resources import URLResources
+
+QUERY = {'users': [{'state': {'equals': 'SP'}}]}
+
+
+class Database(object):
+    """Answers count queries with the number of inserts so far. Count
+    queries wait for `gate` while it is set."""
+
+    def __init__(self):
+        self.inserts = 0
+        self.gate = None
+        self.transport = FakeTransport(self.handle)
+
+    async def handle(self, method, url, headers, data):
+        if url.endswith(URLResources.INSERT):
+            self.inserts += 1
+            return 200, {'status': 'success', 'inserted-entities': 1}
+        # The count is read when the request arrives, before waiting
+        count = self.inserts
+        if self.gate is not None:
+            await self.gate.wait()
+        return 200, {'status': 'success', 'result': {'users': count}}
+
+    def count_requests(self):
+        return sum(1 for _, url, _, _ in self.transport.requests
+                   if url.endswith(URLResources.QUERY_COUNT_ENTITY))
+
+
+def client_for(database):
+    return SlicingDice(master_key='M', transport=database.transport,
+                       cache=ResultCache(), coalesce_reads=False)
+
+
+async def count(client):
+    return ujson.loads(await client.count_entity(QUERY))['result']['users']
+
+
+def test_repeated_query_is_served_from_cache(run):
+    async def main():
+        database = Database()
+        client = client_for(database)
+        assert await count(client) == 0
+        assert await count(client) == 0
+        assert database.count_requests() == 1
+
+    run(main())
+
+
+def test_write_during_read_keeps_stale_result_out_of_cache(run):
+    async def main():
+        database = Database()
+        client = client_for(database)
+        database.gate = asyncio.Event()
+        read = asyncio.ensure_future(count(client))
+        await asyncio.sleep(0.01)
+        # The write completes while the read is in flight
+        await client.insert({'user1@slicingdice.com': {'state': 'SP'}})
+        database.gate.set()
+        assert await read == 0
+        database.gate = None
+        assert await count(client) == 1
+        assert database.count_requests() == 2
+        assert await count(client) == 1
+        assert database.count_requests() == 2
+
+    run(main())
+
+
+def test_write_clears_cached_results(run):
+    async def main():
+        database = Database()
+        client = client_for(database)
+        assert await count(client) == 0
+        await client.insert({'user1@slicingdice.com': {'state': 'SP'}})
+        assert await count(client) == 1
+        assert database.count_requests() == 2
+
+    run(main())
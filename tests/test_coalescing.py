@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+import ujson
+
+from pyslicer import FakeTransport, SlicingDice
+
+QUERY = {'users': [{'state': {'equals': 'SP'}}]}
+
+
+def slow_transport(delay):
+    """Returns a FakeTransport answering after delay seconds, and the urls
+    of the cancelled requests"""
+    cancelled = []
+
+    async def handler(method, url, headers, data):
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            cancelled.append(url)
+            raise
+        return 200, {'status': 'success', 'result': {'users': 10}}
+
+    return FakeTransport(handler), cancelled
+
+
+def test_cancelled_caller_doesnt_cancel_the_others(run):
+    async def main():
+        transport, cancelled = slow_transport(0.05)
+        client = SlicingDice(read_key='R', transport=transport)
+        callers = [asyncio.ensure_future(client.count_entity(QUERY))
+                   for _ in range(3)]
+        await asyncio.sleep(0.01)
+        callers[0].cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await callers[0]
+        for caller in callers[1:]:
+            assert ujson.loads(await caller)['result'] == {'users': 10}
+        assert len(transport.requests) == 1
+        assert cancelled == []
+
+    run(main())
+
+
+def test_request_is_cancelled_with_its_last_caller(run):
+    async def main():
+        transport, cancelled = slow_transport(10)
+        client = SlicingDice(read_key='R', transport=transport)
+        callers = [asyncio.ensure_future(client.count_entity(QUERY))
+                   for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.sleep(0)
+        assert len(transport.requests) == 1
+        assert len(cancelled) == 1
+
+    run(main())
+
+
+def test_bypass_cache_queries_are_not_shared(run):
+    async def main():
+        transport, _ = slow_transport(0.01)
+        client = SlicingDice(read_key='R', transport=transport)
+        query = dict(QUERY, **{'bypass-cache': True})
+        await asyncio.gather(client.count_entity(query),
+                             client.count_entity(query))
+        assert len(transport.requests) == 2
+
+    run(main())
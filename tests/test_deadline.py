@@ -0,0 +1,60 @@
+import asyncio
+import time
+
+import pytest
+
+from pyslicer import FakeTransport, RetryPolicy, SlicingDice
+from pyslicer.exceptions import RequestTimeoutException
+
+
+def unavailable(method, url, headers, data):
+    return 503, 'Service Unavailable'
+
+
+def test_deadline_expires_during_retry_backoff(run):
+    async def main():
+        transport = FakeTransport(unavailable)
+        client = SlicingDice(
+            master_key='M', transport=transport,
+            retry=RetryPolicy(max_retries=5, base_delay=1, jitter=False))
+        started = time.monotonic()
+        with pytest.raises(RequestTimeoutException):
+            await client.get_database(deadline=started + 0.1)
+        # The call ends at the deadline instead of after the backoff, and
+        # no request is sent once the deadline expired
+        assert time.monotonic() - started < 0.5
+        assert len(transport.requests) == 1
+        await asyncio.sleep(0.05)
+        assert len(transport.requests) == 1
+
+    run(main())
+
+
+def test_expired_deadline_sends_nothing(run):
+    async def main():
+        transport = FakeTransport()
+        client = SlicingDice(master_key='M', transport=transport)
+        with pytest.raises(RequestTimeoutException):
+            await client.get_database(deadline=time.monotonic() - 1)
+        assert transport.requests == []
+
+    run(main())
+
+
+def test_timeout_cancels_request_in_flight(run):
+    async def main():
+        cancelled = []
+
+        async def slow(method, url, headers, data):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(url)
+                raise
+
+        client = SlicingDice(master_key='M', transport=FakeTransport(slow))
+        with pytest.raises(RequestTimeoutException):
+            await client.get_database(timeout=0.05)
+        assert len(cancelled) == 1
+
+    run(main())
@@ -0,0 +1,90 @@
+import asyncio
+
+import ujson
+
+from pyslicer import FakeTransport, HedgePolicy, SlicingDice
+from pyslicer.url_resources import URLResources
+
+QUERY = {'users': [{'state': {'equals': 'SP'}}]}
+
+
+def hedge_policy(**kwargs):
+    """Returns a policy hedging count queries after 10ms, with enough fast
+    responses recorded that a few slow ones don't raise the delay"""
+    policy = HedgePolicy(min_delay=0.01, **kwargs)
+    for _ in range(policy.min_samples * 2):
+        policy.record(
+            SlicingDice.BASE_URL + URLResources.QUERY_COUNT_ENTITY, 0.001)
+    return policy
+
+
+def scripted_transport(delays):
+    """Returns a FakeTransport answering its nth request after delays[n]
+    seconds with the request number, and the numbers of the cancelled
+    requests"""
+    cancelled = []
+
+    async def handler(method, url, headers, data):
+        number = len(transport.requests) - 1
+        try:
+            await asyncio.sleep(delays[number])
+        except asyncio.CancelledError:
+            cancelled.append(number)
+            raise
+        return 200, {'status': 'success', 'result': {'users': number}}
+
+    transport = FakeTransport(handler)
+    return transport, cancelled
+
+
+def test_hedge_wins_and_cancels_first_request(run):
+    async def main():
+        transport, cancelled = scripted_transport([10, 0])
+        hedge = hedge_policy()
+        client = SlicingDice(read_key='R', transport=transport, hedge=hedge)
+        result = ujson.loads(await client.count_entity(QUERY))
+        await asyncio.sleep(0)
+        assert result['result'] == {'users': 1}
+        assert cancelled == [0]
+        assert hedge.stats() == {'reads': 1, 'hedges': 1, 'hedge-wins': 1}
+
+    run(main())
+
+
+def test_first_request_wins_and_cancels_hedge(run):
+    async def main():
+        transport, cancelled = scripted_transport([0.05, 10])
+        hedge = hedge_policy()
+        client = SlicingDice(read_key='R', transport=transport, hedge=hedge)
+        result = ujson.loads(await client.count_entity(QUERY))
+        await asyncio.sleep(0)
+        assert result['result'] == {'users': 0}
+        assert cancelled == [1]
+        assert hedge.stats() == {'reads': 1, 'hedges': 1, 'hedge-wins': 0}
+
+    run(main())
+
+
+def test_hedges_stop_when_budget_is_spent(run):
+    async def main():
+        transport, _ = scripted_transport([0.03] * 10)
+        hedge = hedge_policy(budget=2, budget_ratio=0)
+        client = SlicingDice(read_key='R', transport=transport, hedge=hedge)
+        for _ in range(4):
+            await client.count_entity(QUERY)
+        assert hedge.stats()['hedges'] == 2
+        assert len(transport.requests) == 6
+
+    run(main())
+
+
+def test_writes_are_not_hedged(run):
+    async def main():
+        transport, _ = scripted_transport([0.03])
+        hedge = hedge_policy()
+        client = SlicingDice(write_key='W', transport=transport, hedge=hedge)
+        await client.insert({'user1@slicingdice.com': {'age': 22}})
+        assert len(transport.requests) == 1
+        assert hedge.stats()['hedges'] == 0
+
+    run(main())
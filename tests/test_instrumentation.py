@@ -0,0 +1,29 @@
+import time
+
+import ujson
+
+from pyslicer import FakeTransport, Instrumentation, SlicingDice
+
+
+class Recorder(Instrumentation):
+    def __init__(self):
+        self.events = []
+
+    def on_request(self, event):
+        self.events.append(event)
+
+
+def test_total_counts_compression_once(run):
+    recorder = Recorder()
+    client = SlicingDice(master_key='M', transport=FakeTransport(),
+                         compression='gzip', instrumentation=recorder)
+    data = ujson.dumps({
+        'user{}@slicingdice.com'.format(i): {'state': 'SP', 'age': i}
+        for i in range(100000)}).encode('utf-8')
+    started = time.perf_counter()
+    run(client.insert(data))
+    elapsed = time.perf_counter() - started
+    event, = recorder.events
+    assert event.serialization > 0
+    assert event.total <= elapsed
+    assert event.total >= event.serialization + event.network
@@ -0,0 +1,32 @@
+import asyncio
+
+from pyslicer import FakeTransport, SlicingDice
+
+QUERY = {'query': [{'state': {'equals': 'SP'}}], 'columns': ['state'],
+         'limit': 2}
+
+
+def test_closing_iterator_cancels_page_fetcher(run):
+    async def main():
+        cancelled = []
+
+        async def handler(method, url, headers, data):
+            if len(transport.requests) == 1:
+                return 200, {'status': 'success', 'next-page': 'p2',
+                             'data': {'user1': {'state': 'SP'}}}
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        transport = FakeTransport(handler)
+        client = SlicingDice(read_key='R', transport=transport)
+        records = client.iter_result(QUERY)
+        record = await records.__anext__()
+        assert record == {'state': 'SP', 'entity-id': 'user1'}
+        await records.aclose()
+        await asyncio.sleep(0.01)
+        assert cancelled == [True]
+
+    run(main())
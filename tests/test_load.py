@@ -0,0 +1,100 @@
+import functools
+import os
+
+import pytest
+import ujson
+
+from pyslicer import FakeTransport
+from pyslicer.load import Checkpoint, Spans, load, part_path, write_entry
+
+
+def test_spans_merge_touching_and_overlapping_spans():
+    spans = Spans([(10, 20), (30, 40)])
+    spans.add(20, 25)
+    spans.add(35, 50)
+    assert list(spans) == [(10, 25), (30, 50)]
+    spans.add(0, 100)
+    assert list(spans) == [(0, 100)]
+
+
+def test_spans_lookups():
+    spans = Spans([(10, 20), (30, 40)])
+    assert 10 in spans and 19 in spans
+    assert 20 not in spans and 5 not in spans
+    assert spans.covers(10, 20) and spans.covers(12, 18)
+    assert not spans.covers(10, 30) and not spans.covers(25, 35)
+    assert list(spans.within(15, 35)) == [(10, 20), (30, 40)]
+    assert list(spans.within(20, 30)) == []
+
+
+def write_records(path, ids):
+    with open(path, 'w') as records_file:
+        for entity_id in ids:
+            records_file.write(ujson.dumps({'entity-id': entity_id,
+                                            'x': 1}) + '\n')
+
+
+def test_checkpoint_merges_worker_parts(tmp_path):
+    source = str(tmp_path / 'records.ndjson')
+    write_records(source, ['a', 'b'])
+    path = str(tmp_path / 'records.checkpoint')
+    Checkpoint(path, source, 100).close()
+    with open(part_path(path, 1), 'w') as part_file:
+        write_entry(part_file, {'start': 0, 'end': 10,
+                                'inserted-entities': 1})
+        # Line cut short by a worker killed while writing it
+        part_file.write('{"start": 10, "e')
+
+    checkpoint = Checkpoint(path, source, 100)
+    checkpoint.close()
+    assert list(checkpoint.completed) == [(0, 10)]
+    assert not os.path.exists(part_path(path, 1))
+    assert list(Checkpoint(path, source, 100).completed) == [(0, 10)]
+    with pytest.raises(ValueError):
+        Checkpoint(path, source, 200)
+
+
+def insert_and_stop(log_path, flag_path, method, url, headers, data):
+    """Logs the ids of each batch and kills the worker the first time a
+    batch holds the entity 'stop'"""
+    ids = [key for key in ujson.loads(data) if key != 'auto-create']
+    if 'stop' in ids and not os.path.exists(flag_path):
+        open(flag_path, 'w').close()
+        os._exit(1)
+    with open(log_path, 'a') as log_file:
+        log_file.write(ujson.dumps(ids) + '\n')
+    return 200, {'status': 'success', 'inserted-entities': len(ids)}
+
+
+def sent_ids(log_path):
+    with open(log_path) as log_file:
+        return [entity_id for line in log_file
+                for entity_id in ujson.loads(line)]
+
+
+def test_resume_sends_only_the_batches_not_inserted(tmp_path):
+    ids = ['e{}'.format(number) for number in range(50)]
+    ids[25] = 'stop'
+    ids[5] = 'e4'
+    source = str(tmp_path / 'records.ndjson')
+    write_records(source, ids)
+    log_path = str(tmp_path / 'sent')
+    transport = FakeTransport(functools.partial(
+        insert_and_stop, log_path, str(tmp_path / 'stopped')))
+    options = {'write_key': 'W', 'concurrency': 1, 'transport': transport}
+
+    totals = load(source, options, workers=1, batch_size=10)
+    assert totals['failed-ranges'] == 1
+    # The repeated id 'e4' starts a new batch instead of replacing a
+    # record, and the batches sent before the worker died are recorded
+    assert sent_ids(log_path) == ids[:25]
+
+    os.remove(log_path)
+    totals = load(source, options, workers=1, batch_size=10)
+    assert totals['failed-ranges'] == 0
+    assert totals['inserted-entities'] == 25
+    assert sent_ids(log_path) == ids[25:]
+
+    totals = load(source, options, workers=1, batch_size=10)
+    assert totals['skipped-ranges'] == 1
+    assert totals['inserted-entities'] == 0
@@ -0,0 +1,78 @@
+import pytest
+import ujson
+
+from pyslicer import FakeTransport, RetryPolicy, SlicingDice
+from pyslicer import exceptions
+
+QUERY = {'users': [{'state': {'equals': 'SP'}}]}
+INSERT = {'user1@slicingdice.com': {'state': 'SP'}}
+RATE_LIMITED = {'errors': [{'code': 1502, 'message': 'Too many requests'}]}
+
+
+def failing_transport(*failures):
+    """Returns a FakeTransport raising or answering with each of failures
+    in turn, then answering with success"""
+    failures = list(failures)
+
+    def handler(method, url, headers, data):
+        if not failures:
+            return 200, {'status': 'success', 'result': {'users': 1}}
+        failure = failures.pop(0)
+        if isinstance(failure, Exception):
+            raise failure
+        return failure
+
+    return FakeTransport(handler)
+
+
+def client(transport, **kwargs):
+    retry = RetryPolicy(base_delay=0, jitter=False, **kwargs)
+    return SlicingDice(master_key='M', transport=transport, retry=retry)
+
+
+def test_query_retried_after_server_error(run):
+    transport = failing_transport((503, 'unavailable'),
+                                  exceptions.SlicingDiceHTTPError('timeout'))
+    result = ujson.loads(run(client(transport).count_entity(QUERY)))
+    assert result['result'] == {'users': 1}
+    assert len(transport.requests) == 3
+
+
+@pytest.mark.parametrize('failure', [
+    (503, 'unavailable'),
+    exceptions.SlicingDiceHTTPError('Server disconnected'),
+])
+def test_insert_not_retried_after_it_may_have_been_applied(run, failure):
+    transport = failing_transport(failure)
+    with pytest.raises(exceptions.SlicingDiceHTTPError):
+        run(client(transport).insert(INSERT))
+    assert len(transport.requests) == 1
+
+
+@pytest.mark.parametrize('failure', [
+    (429, 'slow down'),
+    (400, RATE_LIMITED),
+    exceptions.ConnectionFailedException('Connection refused'),
+])
+def test_insert_retried_when_it_was_not_applied(run, failure):
+    transport = failing_transport(failure)
+    run(client(transport).insert(INSERT))
+    assert len(transport.requests) == 2
+
+
+def test_retry_writes_retries_insert_after_server_error(run):
+    transport = failing_transport((503, 'unavailable'))
+    run(client(transport, retry_writes=True).insert(INSERT))
+    assert len(transport.requests) == 2
+
+
+def test_max_retries_and_budget(run):
+    transport = failing_transport(*[(503, 'unavailable')] * 10)
+    with pytest.raises(exceptions.SlicingDiceHTTPError):
+        run(client(transport, max_retries=2).count_entity(QUERY))
+    assert len(transport.requests) == 3
+
+    transport = failing_transport(*[(503, 'unavailable')] * 10)
+    with pytest.raises(exceptions.SlicingDiceHTTPError):
+        run(client(transport, budget=1).count_entity(QUERY))
+    assert len(transport.requests) == 2
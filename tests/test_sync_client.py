@@ -0,0 +1,64 @@
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+import pytest
+import ujson
+
+from pyslicer import RetryPolicy, SlicingDice, SyncSlicingDice
+
+QUERY = {'query': [{'state': {'equals': 'SP'}}]}
+
+
+class Handler(BaseHTTPRequestHandler):
+    # Keep connections alive, so the client pools them
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        body = b'{"status": "success", "result": {"query": 1}}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+@pytest.fixture
+def server(monkeypatch):
+    httpd = Server(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(SlicingDice, 'BASE_URL', 'http://{}:{}/v1'.format(
+        *httpd.server_address))
+    yield
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='needs os.fork')
+def test_forked_child_leaves_parent_connections_working(server):
+    client = SyncSlicingDice(master_key='M', timeout=2,
+                             retry=RetryPolicy(max_retries=0))
+    assert ujson.loads(client.count_entity(QUERY))['result'] == {'query': 1}
+    for _ in range(3):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                client.count_entity(QUERY)
+                client.close()
+            finally:
+                os._exit(0)
+        os.waitpid(pid, 0)
+        # The parent reuses its pooled connection
+        result = client.count_entity(QUERY)
+        assert ujson.loads(result)['result'] == {'query': 1}
+    client.close()
@@ -0,0 +1,38 @@
+import pytest
+
+from pyslicer import HTTPXTransport, PoolConfig, SlicingDice
+
+httpx = pytest.importorskip('httpx')
+
+
+@pytest.mark.parametrize('data', [
+    b'{"user1": {"state": "SP"}}',
+    bytearray(b'{"user1": {"state": "SP"}}'),
+    memoryview(b'{"user1": {"state": "SP"}}'),
+])
+def test_httpx_transport_sends_encoded_buffers(run, data):
+    received = []
+
+    def handler(request):
+        received.append(request.content)
+        return httpx.Response(200, content=b'{"status": "success"}')
+
+    transport = HTTPXTransport()
+    transport.client = httpx.AsyncClient(
+        transport=httpx.MockTransport(handler))
+    status, body = run(transport.request(
+        'POST', 'https://api.slicingdice.com/v1/insert', {}, data))
+    run(transport.close())
+    assert status == 200
+    assert received == [b'{"user1": {"state": "SP"}}']
+
+
+def test_key_levels_share_one_tls_context():
+    pool = PoolConfig(limit=10)
+    client = SlicingDice(master_key='M', pool=pool)
+    contexts = {id(requester.transport._ssl)
+                for requester in client._requesters.values()}
+    assert len(contexts) == 1
+    assert pool.ssl_context is None
+    assert all(requester.transport.pool_config.limit == 10
+               for requester in client._requesters.values())
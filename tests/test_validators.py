@@ -0,0 +1,73 @@
+import glob
+import json
+import os
+
+import pytest
+
+from pyslicer import exceptions
+from pyslicer.utils import validators
+from tests_and_examples.benchmarks.validators import (
+    EXAMPLES_PATH, QUERY_VALIDATORS, legacy_validate, load_examples)
+
+EDGE_CASES = [
+    {},
+    [],
+    {'users': {}},
+    {'users': []},
+    {'users': ''},
+    {'users': None},
+    {'users': {'state': {}}},
+    {'users': [{'state': []}]},
+    {'users': [{'state': {'equals': ''}}]},
+    {'users': [{'state': {'equals': None}}]},
+    {'users': [{'age': {'equals': 0}}, 'and', {'vip': {'equals': False}}]},
+    [{'query-name': 'users'}],
+    [{'query-name': 'users', 'query': []}],
+    [{'query-name': 'users', 'query': [{'state': {'equals': 'SP'}}]}],
+]
+
+
+def outcome(validate, data):
+    """Returns 'valid' or the name of the exception raised validating
+    data"""
+    try:
+        validate(data)
+    except exceptions.SlicingDiceException as e:
+        return type(e).__name__
+    return 'valid'
+
+
+def legacy_check_values(data):
+    """The recursive walk check_values replaced"""
+    validator = validators.QueryValidator.__new__(validators.QueryValidator)
+    validator.check_dictionary(data)
+
+
+def example_files():
+    paths = sorted(glob.glob(os.path.join(EXAMPLES_PATH, '*.json')))
+    return [os.path.splitext(os.path.basename(path))[0] for path in paths]
+
+
+@pytest.mark.parametrize('name', example_files())
+def test_examples_validate_as_legacy_validators(name):
+    batches, queries = load_examples(
+        os.path.join(EXAMPLES_PATH, name + '.json'))
+    items = [(validators.InsertValidator, batch) for batch in batches]
+    items += [(QUERY_VALIDATORS.get(name), query) for query in queries]
+    for validator_class, data in items:
+        assert (outcome(validators.check_values, data) ==
+                outcome(legacy_check_values, data) == 'valid')
+        if validator_class is not None:
+            assert (outcome(lambda data: validator_class(data).validator(),
+                            data) ==
+                    outcome(lambda data: legacy_validate(
+                        validator_class, data), data))
+
+
+@pytest.mark.parametrize('data', EDGE_CASES)
+def test_edge_cases_validate_as_legacy_validators(data):
+    assert (outcome(validators.check_values, data) ==
+            outcome(legacy_check_values, data))
+    validate = validators.QueryCountValidator
+    assert (outcome(lambda data: validate(data).validator(), data) ==
+            outcome(lambda data: legacy_validate(validate, data), data))
@@ -0,0 +1,125 @@
+"""Benchmark request body compression.
+
+Compresses the insert and query payloads of every example in ../examples
+with each supported content encoding and reports, per example file, the
+bytes saved, the compression time and the transfer time saved at a given
+uplink bandwidth. Payloads under the threshold are not compressed, as in
+the client.
+
+Run from the repository root with:
+    $ python -m tests_and_examples.benchmarks.compression [--bandwidth MBPS]
+        [--threshold BYTES] [--json]
+"""
+
+import argparse
+import glob
+import json
+import os
+import time
+
+import ujson
+
+from pyslicer.core.requester import compress
+
+EXAMPLES_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', 'examples')
+
+ENCODINGS = ('gzip', 'deflate')
+
+
+def load_payloads(path):
+    """Returns the serialized request bodies of an example file.
+
+    Parameters:
+    path -- Path of the example JSON file.
+    """
+    with open(path) as examples_file:
+        examples = json.load(examples_file)
+    payloads = []
+    for example in examples:
+        if 'name' not in example:
+            # *_insert.json files hold insertions only
+            payloads.append(ujson.dumps(example).encode('utf-8'))
+            continue
+        for key in ('insert', 'query', 'additional_operation'):
+            if key not in example:
+                continue
+            if isinstance(example[key], str):
+                # SQL queries are sent as they are
+                payloads.append(example[key].encode('utf-8'))
+            else:
+                payloads.append(ujson.dumps(example[key]).encode('utf-8'))
+    return payloads
+
+
+def benchmark_file(path, encoding, bandwidth, threshold, repeat):
+    """Compress the payloads of an example file as the client does.
+
+    Parameters:
+    path -- Path of the example JSON file.
+    encoding -- Content encoding to benchmark.
+    bandwidth -- Uplink bandwidth in megabits per second.
+    threshold -- Payloads smaller than this are sent uncompressed.
+    repeat -- Number of times each payload is compressed.
+    """
+    payloads = load_payloads(path)
+    original = sum(len(payload) for payload in payloads)
+    compressed = 0
+    started = time.perf_counter()
+    for _ in range(repeat):
+        compressed = sum(
+            len(compress(payload, encoding))
+            if len(payload) >= threshold else len(payload)
+            for payload in payloads)
+    elapsed = (time.perf_counter() - started) / repeat
+
+    bytes_per_second = bandwidth * 1000000 / 8
+    transfer_saved = (original - compressed) / bytes_per_second
+    return {
+        'file': os.path.basename(path),
+        'encoding': encoding,
+        'payloads': len(payloads),
+        'original-bytes': original,
+        'compressed-bytes': compressed,
+        'ratio': round(original / compressed, 2) if compressed else None,
+        'compression-seconds': round(elapsed, 6),
+        'time-saved-seconds': round(transfer_saved - elapsed, 6)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--bandwidth', type=float, default=100.0,
+                        help='uplink bandwidth in Mbit/s (default 100)')
+    parser.add_argument('--threshold', type=int, default=1024,
+                        help='minimum payload size compressed (default 1024)')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='compressions of each payload (default 3)')
+    parser.add_argument('--json', action='store_true',
+                        help='print machine readable results')
+    args = parser.parse_args()
+
+    results = []
+    for path in sorted(glob.glob(os.path.join(EXAMPLES_PATH, '*.json'))):
+        for encoding in ENCODINGS:
+            results.append(benchmark_file(
+                path, encoding, args.bandwidth, args.threshold,
+                args.repeat))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print('{:<18} {:<8} {:>12} {:>12} {:>7} {:>10} {:>10}'.format(
+        'file', 'encoding', 'original', 'compressed', 'ratio',
+        'cpu (ms)', 'saved (ms)'))
+    for result in results:
+        print('{:<18} {:<8} {:>12} {:>12} {:>7} {:>10.2f} {:>10.2f}'.format(
+            result['file'], result['encoding'], result['original-bytes'],
+            result['compressed-bytes'], result['ratio'],
+            result['compression-seconds'] * 1000,
+            result['time-saved-seconds'] * 1000))
+
+
+if __name__ == '__main__':
+    main()
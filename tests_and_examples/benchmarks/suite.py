@@ -0,0 +1,316 @@
+"""Benchmark the client hot paths.
+
+Runs, on the payloads of ../examples:
+    - validators: validation time per entity and per query, see
+      validators.py
+    - dumps: ujson.dumps time per insert batch and per query
+    - throughput: insert_many entities per second and count_entity
+      queries per second against an in-process stand-in server
+    - memory: memory held by the client per in-flight insert batch and
+      count query, against a stand-in server run as a separate process
+
+Results are written as JSON with the Python and library versions, and can
+be compared with the results of another version.
+
+Run from the repository root with:
+    $ python -m tests_and_examples.benchmarks.suite [--output FILE]
+        [--compare BASELINE] [--only NAME] [--repeat N]
+"""
+
+import argparse
+import asyncio
+import glob
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import aiohttp
+import ujson
+
+from pyslicer import SlicingDice
+from pyslicer.utils.concurrency import bounded_map
+from tests_and_examples.benchmarks import validators as validator_benchmark
+from tests_and_examples.stand_in import StandInServer
+
+EXAMPLES_PATH = validator_benchmark.EXAMPLES_PATH
+
+ROOT_PATH = os.path.join(EXAMPLES_PATH, '..', '..')
+
+# Example file whose inserts are used by the throughput benchmark
+THROUGHPUT_EXAMPLE = 'aggregation.json'
+
+QUERY_EXAMPLE = 'count_entity.json'
+
+BENCHMARKS = ('validators', 'dumps', 'throughput', 'memory')
+
+
+def best_time(func, repeat):
+    """Returns the best of repeat timings of func, in seconds."""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def example_path(name):
+    return os.path.join(EXAMPLES_PATH, name)
+
+
+def bench_validators(repeat):
+    return [dict(result, benchmark='validators')
+            for result in validator_benchmark.run(repeat)]
+
+
+def bench_dumps(repeat):
+    """Time ujson.dumps of the insert batches and queries of each example
+    file."""
+    results = []
+    for path in sorted(glob.glob(os.path.join(EXAMPLES_PATH, '*.json'))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        batches, queries = validator_benchmark.load_examples(path)
+        for workload, items in (('insert', batches), ('query', queries)):
+            if not items:
+                continue
+            size = sum(len(ujson.dumps(item)) for item in items)
+            elapsed = best_time(
+                lambda: [ujson.dumps(item) for item in items], repeat)
+            results.append({
+                'benchmark': 'dumps',
+                'workload': '{} {}'.format(name, workload),
+                'units': len(items),
+                'bytes': size,
+                'us-per-unit': round(elapsed / len(items) * 1e6, 3),
+                'mb-per-second': round(size / elapsed / 1e6, 1)
+            })
+    return results
+
+
+async def _throughput(latency, concurrency, repeat):
+    batches, _ = validator_benchmark.load_examples(
+        example_path(THROUGHPUT_EXAMPLE))
+    entities = [pair for batch in batches for pair in batch.items()]
+    _, queries = validator_benchmark.load_examples(
+        example_path(QUERY_EXAMPLE))
+    queries = queries * repeat
+    results = []
+
+    async with StandInServer(latency={'*': latency}) as server:
+        SlicingDice.BASE_URL = server.url
+        async with SlicingDice(master_key='benchmark',
+                               concurrency=concurrency,
+                               coalesce_reads=False) as client:
+            started = time.perf_counter()
+            summary = await client.insert_many(
+                entities, auto_create=['column'])
+            elapsed = time.perf_counter() - started
+            results.append({
+                'benchmark': 'throughput',
+                'workload': 'insert_many',
+                'units': len(entities),
+                'requests': len(summary['batches']),
+                'failed-batches': summary['failed-batches'],
+                'seconds': round(elapsed, 4),
+                'units-per-second': round(len(entities) / elapsed, 1)
+            })
+
+            # Queries run on an empty database, so the stand-in does
+            # no query evaluation work
+            server.entities.clear()
+            started = time.perf_counter()
+            await bounded_map(client.count_entity, queries, concurrency)
+            elapsed = time.perf_counter() - started
+            results.append({
+                'benchmark': 'throughput',
+                'workload': 'count_entity',
+                'units': len(queries),
+                'requests': len(queries),
+                'seconds': round(elapsed, 4),
+                'units-per-second': round(len(queries) / elapsed, 1)
+            })
+    return results
+
+
+def bench_throughput(repeat, latency=0.0, concurrency=10):
+    return asyncio.get_event_loop().run_until_complete(
+        _throughput(latency, concurrency, repeat))
+
+
+def _free_port():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+def _wait_for_port(port, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), 0.1).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError('The stand-in server did not start')
+
+
+async def _memory(url, in_flight):
+    batches, _ = validator_benchmark.load_examples(
+        example_path(THROUGHPUT_EXAMPLE))
+    _, queries = validator_benchmark.load_examples(
+        example_path(QUERY_EXAMPLE))
+    workloads = (
+        ('insert', lambda client: client.insert(
+            dict(batches[0], **{'auto-create': ['column']}))),
+        ('count_entity', lambda client: client.count_entity(queries[0])),
+    )
+    results = []
+    SlicingDice.BASE_URL = url
+    for workload, request in workloads:
+        async with SlicingDice(master_key='benchmark',
+                               coalesce_reads=False) as client:
+            # The first request opens the session and a connection
+            await request(client)
+            tracemalloc.start()
+            baseline = tracemalloc.get_traced_memory()[0]
+            tasks = [asyncio.ensure_future(request(client))
+                     for _ in range(in_flight)]
+            # Requests wait on the server latency, all of them in flight
+            await asyncio.sleep(0.25)
+            held = tracemalloc.get_traced_memory()[0] - baseline
+            await asyncio.gather(*tasks)
+            peak = tracemalloc.get_traced_memory()[1] - baseline
+            tracemalloc.stop()
+        results.append({
+            'benchmark': 'memory',
+            'workload': workload,
+            'units': in_flight,
+            'bytes-per-request': held // in_flight,
+            'peak-bytes-per-request': peak // in_flight
+        })
+    return results
+
+
+def bench_memory(repeat, in_flight=100):
+    """Measure client memory with the server in another process, so only
+    client allocations are traced."""
+    port = _free_port()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'tests_and_examples.stand_in',
+         '--port', str(port), '--latency', '0.5'],
+        cwd=ROOT_PATH, stdout=subprocess.DEVNULL)
+    try:
+        _wait_for_port(port)
+        url = 'http://127.0.0.1:{}/v1'.format(port)
+        return asyncio.get_event_loop().run_until_complete(
+            _memory(url, in_flight))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def _version():
+    try:
+        return subprocess.check_output(
+            ['git', 'describe', '--always', '--dirty'], cwd=ROOT_PATH,
+            stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(only=None, repeat=5):
+    """Returns the environment and the results of the benchmarks.
+
+    Parameters:
+    only -- Names of the benchmarks to run, all when None.
+    repeat -- Number of measurements of each workload.
+    """
+    runners = {
+        'validators': bench_validators,
+        'dumps': bench_dumps,
+        'throughput': bench_throughput,
+        'memory': bench_memory,
+    }
+    results = []
+    for name in BENCHMARKS:
+        if only is None or name in only:
+            results.extend(runners[name](repeat))
+    return {
+        'environment': {
+            'revision': _version(),
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'aiohttp': aiohttp.__version__,
+            'ujson': getattr(ujson, '__version__', None),
+            'date': time.strftime('%Y-%m-%dT%H:%M:%S')
+        },
+        'results': results
+    }
+
+
+def compare(results, baseline):
+    """Returns (benchmark, workload, metric, baseline, current, ratio) for
+    the numeric metrics found in both runs.
+
+    Parameters:
+    results -- The output of run().
+    baseline -- The output of run() for another version.
+    """
+    previous = {(result['benchmark'], result['workload']): result
+                for result in baseline['results']}
+    rows = []
+    for result in results['results']:
+        old = previous.get((result['benchmark'], result['workload']))
+        if old is None:
+            continue
+        for metric, value in result.items():
+            old_value = old.get(metric)
+            if (metric == 'units' or not isinstance(value, (int, float)) or
+                    not isinstance(old_value, (int, float)) or
+                    not old_value):
+                continue
+            rows.append((result['benchmark'], result['workload'], metric,
+                         old_value, value, round(value / old_value, 3)))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--output', default=None,
+                        help='write the results as JSON to this file')
+    parser.add_argument('--compare', default=None,
+                        help='results file of another version to compare '
+                             'with')
+    parser.add_argument('--only', action='append', choices=BENCHMARKS,
+                        help='run only this benchmark, may be repeated')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='measurements of each workload (default 5)')
+    args = parser.parse_args()
+
+    results = run(args.only, args.repeat)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(results, output_file, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        print('{:<11} {:<22} {:<22} {:>12} {:>12} {:>7}'.format(
+            'benchmark', 'workload', 'metric', 'baseline', 'current',
+            'ratio'), file=sys.stderr)
+        for row in compare(results, baseline):
+            print('{:<11} {:<22} {:<22} {:>12} {:>12} {:>7}'.format(*row),
+                  file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+"""Compare the throughput of the HTTP transports at high concurrency.
+
+Sends count_entity queries with many requests in flight to a local server
+that answers after a fixed latency, with:
+    - aiohttp: the default AiohttpTransport, HTTP/1.1 with one connection
+      per request in flight
+    - httpx-http1: HTTPXTransport restricted to HTTP/1.1
+    - httpx-http2: HTTPXTransport multiplexing every request over HTTP/2
+
+and reports queries per second and the number of connections the server
+accepted for the queries. The server, run as a separate process so its
+work isn't timed, uses hypercorn to serve HTTP/1.1 and HTTP/2 on the same
+port. It needs:
+
+    $ pip install 'httpx[http2]' hypercorn
+
+Run from the repository root with:
+    $ python -m tests_and_examples.benchmarks.transports [--requests N]
+        [--concurrency N] [--latency SECONDS]
+"""
+
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import time
+
+from pyslicer import AiohttpTransport, HTTPXTransport, PoolConfig, SlicingDice
+from pyslicer.utils.concurrency import bounded_map
+from tests_and_examples.benchmarks.suite import (
+    ROOT_PATH, _free_port, _wait_for_port)
+
+QUERY = {
+    'users-from-sao-paulo': [{'state': {'equals': 'SP'}}],
+    'dimension': 'users'
+}
+
+TRANSPORTS = ('aiohttp', 'httpx-http1', 'httpx-http2')
+
+
+def build_transport(name, concurrency):
+    """Returns the transport of a benchmark backend, with as many
+    connections as requests in flight"""
+    pool = PoolConfig(limit=concurrency)
+    if name == 'aiohttp':
+        return AiohttpTransport(use_ssl=False, pool_config=pool)
+    elif name == 'httpx-http1':
+        return HTTPXTransport(use_ssl=False, pool_config=pool, http2=False)
+    # The server is plain HTTP, so HTTP/2 is used without negotiation
+    return HTTPXTransport(use_ssl=False, pool_config=pool, http1=False)
+
+
+def serve(port, latency):
+    """Run an ASGI server answering every query after latency seconds and
+    GET /stats with the connections accepted"""
+    from hypercorn.asyncio import serve as hypercorn_serve
+    from hypercorn.config import Config
+
+    clients = set()
+    versions = {}
+
+    async def app(scope, receive, send):
+        if scope['type'] != 'http':
+            return
+        more_body = True
+        while more_body:
+            message = await receive()
+            more_body = message.get('more_body', False)
+        if scope['path'] == '/stats':
+            body = json.dumps({'connections': len(clients),
+                               'http-versions': versions})
+            clients.clear()
+            versions.clear()
+        else:
+            clients.add(tuple(scope['client']))
+            versions[scope['http_version']] = (
+                versions.get(scope['http_version'], 0) + 1)
+            await asyncio.sleep(latency)
+            body = json.dumps({'status': 'success', 'result': {
+                'users-from-sao-paulo': 10}, 'took': latency})
+        await send({'type': 'http.response.start', 'status': 200,
+                    'headers': [(b'content-type', b'application/json')]})
+        await send({'type': 'http.response.body', 'body': body.encode()})
+
+    config = Config()
+    config.bind = ['127.0.0.1:{}'.format(port)]
+    config.backlog = 1024
+    config.keep_alive_timeout = 60
+    # HTTP/2 sends every request over one connection, that must stay open
+    config.keep_alive_max_requests = sys.maxsize
+    config.h2_max_concurrent_streams = 1000
+    config.accesslog = None
+    asyncio.get_event_loop().run_until_complete(hypercorn_serve(app, config))
+
+
+async def _stats(base_url):
+    """Returns and resets the server connection counters"""
+    transport = HTTPXTransport(use_ssl=False, http2=False)
+    try:
+        _, body = await transport.request('GET', base_url + '/stats', {})
+    finally:
+        await transport.close()
+    return json.loads(body.decode('utf-8'))
+
+
+async def _run(base_url, requests, concurrency):
+    SlicingDice.BASE_URL = base_url + '/v1'
+    results = []
+    for name in TRANSPORTS:
+        await _stats(base_url)
+        async with SlicingDice(
+                master_key='benchmark', coalesce_reads=False,
+                transport=build_transport(name, concurrency)) as client:
+            # The first request opens the first connection
+            await client.count_entity(QUERY)
+            started = time.perf_counter()
+            await bounded_map(client.count_entity, [QUERY] * requests,
+                              concurrency)
+            elapsed = time.perf_counter() - started
+        stats = await _stats(base_url)
+        results.append({
+            'benchmark': 'transports',
+            'workload': name,
+            'units': requests,
+            'concurrency': concurrency,
+            'seconds': round(elapsed, 4),
+            'units-per-second': round(requests / elapsed, 1),
+            'connections': stats['connections'],
+            'http-versions': stats['http-versions']
+        })
+    return results
+
+
+def run(requests=3000, concurrency=300, latency=0.05):
+    """Returns the results of each transport, running the server in
+    another process"""
+    port = _free_port()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'tests_and_examples.benchmarks.transports',
+         '--serve', str(port), '--latency', str(latency)],
+        cwd=ROOT_PATH, stdout=subprocess.DEVNULL)
+    try:
+        _wait_for_port(port)
+        return asyncio.get_event_loop().run_until_complete(_run(
+            'http://127.0.0.1:{}'.format(port), requests, concurrency))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=3000,
+                        help='queries sent with each transport '
+                             '(default 3000)')
+    parser.add_argument('--concurrency', type=int, default=300,
+                        help='queries in flight (default 300)')
+    parser.add_argument('--latency', type=float, default=0.05,
+                        help='seconds the server takes to answer '
+                             '(default 0.05)')
+    parser.add_argument('--serve', type=int, default=None,
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve is not None:
+        serve(args.serve, args.latency)
+        return
+
+    print('{:<12} {:>8} {:>11} {:>9} {:>14} {:>12}'.format(
+        'transport', 'queries', 'concurrency', 'seconds', 'queries/sec',
+        'connections'))
+    for result in run(args.requests, args.concurrency, args.latency):
+        print('{:<12} {:>8} {:>11} {:>9} {:>14} {:>12}'.format(
+            result['workload'], result['units'], result['concurrency'],
+            result['seconds'], result['units-per-second'],
+            result['connections']))
+
+
+if __name__ == '__main__':
+    main()
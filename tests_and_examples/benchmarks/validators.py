@@ -0,0 +1,169 @@
+"""Benchmark insert and query validation.
+
+Validates the insertions and queries of every example in ../examples with
+the recursive validation used up to version 2.1.0 and with each validation
+level of the current validators, reporting the time per entity for
+insertions and per query for queries.
+
+Run from the repository root with:
+    $ python -m tests_and_examples.benchmarks.validators [--json]
+"""
+
+import argparse
+import glob
+import json
+import os
+import time
+
+from pyslicer.utils import validators
+from pyslicer.utils.data_utils import chunk_insertion
+
+EXAMPLES_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', 'examples')
+
+QUERY_VALIDATORS = {
+    'count_entity': validators.QueryCountValidator,
+    'count_event': validators.QueryCountValidator,
+    'top_values': validators.QueryValidator,
+    'result': validators.QueryDataExtractionValidator,
+    'score': validators.QueryDataExtractionValidator,
+}
+
+LEVELS = (validators.VALIDATION_FULL, validators.VALIDATION_STRUCTURAL)
+
+
+def legacy_validate(validator_class, data):
+    """Validate data as the 2.1.0 validators did: a recursive walk of the
+    whole payload followed, for insertions, by a str() of every entity.
+
+    Parameters:
+    validator_class -- The validator of the request.
+    data -- The insertion or query.
+    """
+    validator = validator_class.__new__(validator_class)
+    validator.check_dictionary(data)
+    validator.data = data
+    if validator_class is validators.InsertValidator:
+        for value in data.values():
+            if not isinstance(value, (dict, list)) or len(str(value)) == 0:
+                raise ValueError("The value for an id should be a dictionary")
+    return validator.validator()
+
+
+def load_examples(path):
+    """Returns the insert batches and the queries of an example file.
+
+    Parameters:
+    path -- Path of the example JSON file.
+    """
+    with open(path) as examples_file:
+        examples = json.load(examples_file)
+    entities = []
+    queries = []
+    for index, example in enumerate(examples):
+        insertion = example.get('insert', example if 'name' not in example
+                                else {})
+        for entity_id, columns in insertion.items():
+            if entity_id != 'auto-create':
+                # Entity ids repeat between examples
+                entities.append(('{}-{}'.format(index, entity_id), columns))
+        if isinstance(example.get('query'), (dict, list)):
+            queries.append(example['query'])
+    batches = list(chunk_insertion(
+        entities, validators.MAX_INSERTION_BATCH_SIZE))
+    return batches, queries
+
+
+def time_validation(validate, items, repeat):
+    """Returns the best time, in seconds, to validate all items.
+
+    Parameters:
+    validate -- Called with each item.
+    items -- Insertions or queries.
+    repeat -- Number of measurements.
+    """
+    best = None
+    for _ in range(repeat):
+        # Small workloads are validated again until 10ms have passed
+        rounds = 0
+        started = time.perf_counter()
+        while True:
+            for item in items:
+                validate(item)
+            rounds += 1
+            elapsed = time.perf_counter() - started
+            if elapsed >= 0.01:
+                break
+        elapsed /= rounds
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def benchmark(name, validator_class, items, units, repeat):
+    """Time the legacy validation and every validation level.
+
+    Parameters:
+    name -- Name of the workload.
+    validator_class -- The validator of the workload.
+    items -- Insertions or queries.
+    units -- Number of entities or queries in items.
+    repeat -- Number of measurements.
+    """
+    result = {'workload': name, 'units': units}
+    legacy = time_validation(
+        lambda item: legacy_validate(validator_class, item), items, repeat)
+    result['legacy-us'] = round(legacy / units * 1e6, 3)
+    for level in LEVELS:
+        elapsed = time_validation(
+            lambda item: validator_class(item, level).validator(),
+            items, repeat)
+        result[level + '-us'] = round(elapsed / units * 1e6, 3)
+        result[level + '-speedup'] = round(legacy / elapsed, 2)
+    return result
+
+
+def run(repeat=5):
+    """Returns the results of every workload."""
+    results = []
+    for path in sorted(glob.glob(os.path.join(EXAMPLES_PATH, '*.json'))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        batches, queries = load_examples(path)
+        if batches:
+            entities = sum(len(batch) for batch in batches)
+            results.append(benchmark(
+                name + ' insert', validators.InsertValidator, batches,
+                entities, repeat))
+        if name in QUERY_VALIDATORS and queries:
+            results.append(benchmark(
+                name + ' query', QUERY_VALIDATORS[name], queries,
+                len(queries), repeat))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='measurements of each workload (default 5)')
+    parser.add_argument('--json', action='store_true',
+                        help='print machine readable results')
+    args = parser.parse_args()
+
+    results = run(args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print('Microseconds per entity (insert) or per query.')
+    print('{:<22} {:>7} {:>9} {:>9} {:>8} {:>11} {:>8}'.format(
+        'workload', 'units', 'legacy', 'full', 'speedup', 'structural',
+        'speedup'))
+    for result in results:
+        print('{:<22} {:>7} {:>9.3f} {:>9.3f} {:>8.2f} {:>11.3f} '
+              '{:>8.2f}'.format(
+                  result['workload'], result['units'], result['legacy-us'],
+                  result['full-us'], result['full-speedup'],
+                  result['structural-us'], result['structural-speedup']))
+
+
+if __name__ == '__main__':
+    main()
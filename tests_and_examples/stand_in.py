@@ -0,0 +1,620 @@
+"""Local stand-in for the SlicingDice API.
+
+An aiohttp server implementing every route of URLResources over an in
+memory database, so the client can be tested and benchmarked offline. Each
+route can be given a latency distribution and injected failures (API error
+codes such as 1502 and 1507, 5xx statuses and timeouts), and every request
+is accounted per route.
+
+Use it in process, pointing the client at its url:
+
+    async with StandInServer(
+            latency={'*': ('uniform', 0.001, 0.005)},
+            faults={URLResources.INSERT: {1502: 0.1}}) as server:
+        SlicingDice.BASE_URL = server.url
+        ...
+        print(server.stats())
+
+or run it on its own and set SD_API_ADDRESS before starting the client:
+    $ python -m tests_and_examples.stand_in --port 8765 --latency 0.002
+    $ SD_API_ADDRESS=http://127.0.0.1:8765/v1 python my_script.py
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from collections import Counter
+
+import ujson
+from aiohttp import web
+
+from pyslicer.url_resources import URLResources
+
+API_PREFIX = '/v1'
+
+DEFAULT_DIMENSION = 'default'
+
+# HTTP status sent with each injected API error code
+ERROR_STATUSES = {1502: 429, 1507: 413}
+
+ERROR_MESSAGES = {
+    1502: 'Request rate limit exceeded.',
+    1507: 'Request body size exceeded.',
+}
+
+TIMEOUT = 'timeout'
+
+DEFAULT_PAGE_LIMIT = 10
+
+# Parameters of top values and aggregation queries that aren't columns
+TOP_PARAMETERS = ('equals', 'not-equals', 'contains', 'not-contains',
+                  'starts-with', 'ends-with', 'between', 'interval')
+
+
+def sample_latency(spec, rng):
+    """Returns a latency in seconds drawn from a distribution.
+
+    Parameters:
+    spec -- Seconds as a number, a tuple ('uniform', low, high),
+        ('normal', mean, stddev), ('lognormal', mu, sigma) or
+        ('exponential', mean), or a callable receiving a random.Random.
+    rng -- The random.Random of the server.
+    """
+    if spec is None:
+        return 0
+    if callable(spec):
+        return max(0, spec(rng))
+    if isinstance(spec, (int, float)):
+        return spec
+    kind, *parameters = spec
+    if kind == 'uniform':
+        return rng.uniform(*parameters)
+    if kind == 'normal':
+        return max(0, rng.gauss(*parameters))
+    if kind == 'lognormal':
+        return rng.lognormvariate(*parameters)
+    if kind == 'exponential':
+        return rng.expovariate(1 / parameters[0])
+    raise ValueError("Unknown latency distribution: {}".format(kind))
+
+
+def _values(stored):
+    """Returns the values of a stored column as a list, taking the value
+    of events"""
+    items = stored if isinstance(stored, list) else [stored]
+    return [item.get('value') if isinstance(item, dict) else item
+            for item in items]
+
+
+def _compare(value, operator, expected):
+    if operator == 'equals':
+        return value == expected or str(value) == str(expected)
+    if operator == 'not-equals':
+        return not _compare(value, 'equals', expected)
+    if operator == 'in':
+        return any(_compare(value, 'equals', item) for item in expected)
+    try:
+        value, expected = float(value), float(expected)
+    except (TypeError, ValueError):
+        value, expected = str(value), str(expected)
+    if operator == 'gt':
+        return value > expected
+    if operator == 'gte':
+        return value >= expected
+    if operator == 'lt':
+        return value < expected
+    if operator == 'lte':
+        return value <= expected
+    # Other parameters, such as 'between' dates, don't filter values
+    return True
+
+
+def _top_value_kept(value, parameters):
+    """Check if a value is counted by a top values or aggregation query
+    with the given parameters. Dates in 'between' don't filter values."""
+    value = str(value)
+    for parameter, expected in parameters.items():
+        expected = [str(item) for item in expected]
+        if parameter == 'equals' and value not in expected:
+            return False
+        if parameter == 'not-equals' and value in expected:
+            return False
+        if parameter == 'contains' and not any(
+                item in value for item in expected):
+            return False
+        if parameter == 'not-contains' and any(
+                item in value for item in expected):
+            return False
+        if parameter == 'starts-with' and not value.startswith(
+                tuple(expected)):
+            return False
+        if parameter == 'ends-with' and not value.endswith(tuple(expected)):
+            return False
+    return True
+
+
+def _matching_values(entity_id, columns, column, condition):
+    """Returns the values of a column satisfying a condition"""
+    if column == 'entity-id':
+        values = [entity_id]
+    elif column in columns:
+        values = _values(columns[column])
+    else:
+        return []
+    if not isinstance(condition, dict):
+        return values
+    return [value for value in values
+            if all(_compare(value, operator, expected)
+                   for operator, expected in condition.items())]
+
+
+def matches(entity_id, columns, query):
+    """Returns the number of values of an entity matching a query, 0 when
+    the entity doesn't match. Conditions are combined from left to right
+    with the 'and' or 'or' between them.
+
+    Parameters:
+    entity_id -- The entity id.
+    columns -- The stored columns of the entity.
+    query -- A list of conditions.
+    """
+    total = None
+    operator = 'and'
+    for item in query:
+        if isinstance(item, str):
+            operator = item.lower()
+            continue
+        found = min(len(_matching_values(entity_id, columns, column,
+                                         condition))
+                    for column, condition in item.items())
+        if total is None:
+            total = found
+        elif operator == 'or':
+            total = max(total, found)
+        else:
+            total = min(total, found)
+    return 1 if total is None else total
+
+
+class StandInServer(object):
+    """In memory SlicingDice API with latency and fault injection."""
+
+    def __init__(self, latency=None, faults=None, seed=None,
+                 timeout_delay=120):
+        """
+        Parameters:
+        latency -- Latency of each route, keyed by URLResources path or '*'
+            for every route. See sample_latency for the accepted values.
+        faults -- Failure probabilities of each route, keyed by
+            URLResources path or '*', e.g. {URLResources.INSERT: {1502: 0.1,
+            500: 0.05, 'timeout': 0.01}}. Codes from 400 to 599 are HTTP
+            statuses, other codes are API errors.
+        seed -- Seed of the latency and fault random generator.
+        timeout_delay -- Seconds a 'timeout' failure waits before answering.
+        """
+        self.latency = latency or {}
+        self.faults = faults or {}
+        self.timeout_delay = timeout_delay
+        self.rng = random.Random(seed)
+        self.columns = {}
+        self.entities = {}
+        self.saved_queries = {}
+        self._scripted = {}
+        self._runner = None
+        self.port = None
+        self.reset_stats()
+        self._routes = [
+            ('GET', URLResources.DATABASE, self.get_database),
+            ('GET', URLResources.COLUMN, self.get_columns),
+            ('POST', URLResources.COLUMN, self.create_column),
+            ('POST', URLResources.INSERT, self.insert),
+            ('POST', URLResources.QUERY_COUNT_ENTITY_TOTAL,
+             self.count_entity_total),
+            ('POST', URLResources.QUERY_COUNT_ENTITY, self.count_entity),
+            ('POST', URLResources.QUERY_COUNT_EVENT, self.count_event),
+            ('POST', URLResources.QUERY_AGGREGATION, self.aggregation),
+            ('POST', URLResources.QUERY_TOP_VALUES, self.top_values),
+            ('POST', URLResources.QUERY_EXISTS_ENTITY, self.exists_entity),
+            ('GET', URLResources.QUERY_SAVED, self.get_saved_queries),
+            ('POST', URLResources.QUERY_SAVED, self.create_saved_query),
+            ('GET', URLResources.QUERY_SAVED + '{name}',
+             self.get_saved_query),
+            ('PUT', URLResources.QUERY_SAVED + '{name}',
+             self.update_saved_query),
+            ('DELETE', URLResources.QUERY_SAVED + '{name}',
+             self.delete_saved_query),
+            ('POST', URLResources.QUERY_DATA_EXTRACTION_RESULT, self.result),
+            ('POST', URLResources.QUERY_DATA_EXTRACTION_SCORE, self.score),
+            ('POST', URLResources.QUERY_SQL, self.sql),
+            ('POST', URLResources.DELETE, self.delete),
+            ('POST', URLResources.UPDATE, self.update),
+        ]
+
+    @property
+    def url(self):
+        """The address to use as SlicingDice.BASE_URL or SD_API_ADDRESS"""
+        return 'http://127.0.0.1:{}{}'.format(self.port, API_PREFIX)
+
+    async def start(self, host='127.0.0.1', port=0):
+        """Start listening, on a free port when port is 0"""
+        app = web.Application(client_max_size=1024 ** 3)
+        for method, path, handler in self._routes:
+            route = path.split('{')[0]
+            app.router.add_route(method, API_PREFIX + path,
+                                 self._wrap(route, handler))
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        self.port = self._runner.addresses[0][1]
+        return self
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.stop()
+
+    def fail_next(self, route, error, times=1):
+        """Fail the next requests of a route, before random faults.
+
+        Parameters:
+        route -- The URLResources path.
+        error -- An API error code, an HTTP status or 'timeout'.
+        times -- Number of requests failing.
+        """
+        self._scripted.setdefault(route, []).extend([error] * times)
+
+    def reset_stats(self):
+        self._stats = {}
+
+    def stats(self):
+        """Returns the request accounting of each route"""
+        return {route: dict(stats, errors=dict(stats['errors']))
+                for route, stats in self._stats.items()}
+
+    def _route_stats(self, route):
+        stats = self._stats.get(route)
+        if stats is None:
+            stats = self._stats[route] = {
+                'requests': 0, 'bytes-received': 0, 'bytes-sent': 0,
+                'in-flight': 0, 'max-in-flight': 0, 'errors': Counter()}
+        return stats
+
+    def _draw_fault(self, route):
+        scripted = self._scripted.get(route)
+        if scripted:
+            return scripted.pop(0)
+        faults = self.faults.get(route, self.faults.get('*', {}))
+        draw = self.rng.random()
+        for error, probability in faults.items():
+            if draw < probability:
+                return error
+            draw -= probability
+        return None
+
+    def _wrap(self, route, handler):
+        async def handle(request):
+            stats = self._route_stats(route)
+            stats['requests'] += 1
+            stats['in-flight'] += 1
+            stats['max-in-flight'] = max(stats['max-in-flight'],
+                                         stats['in-flight'])
+            started = time.perf_counter()
+            try:
+                body = await request.read()
+                stats['bytes-received'] += (request.content_length or
+                                            len(body))
+                delay = sample_latency(
+                    self.latency.get(route, self.latency.get('*')),
+                    self.rng)
+                if delay:
+                    await asyncio.sleep(delay)
+                fault = self._draw_fault(route)
+                if fault is not None:
+                    stats['errors'][fault] += 1
+                    response = await self._fault_response(fault)
+                    if response is not None:
+                        return response
+                try:
+                    if request.content_type == 'application/json' and body:
+                        data = ujson.loads(body)
+                    else:
+                        data = body.decode('utf-8')
+                    result = handler(data, request)
+                except (KeyError, TypeError, ValueError,
+                        AttributeError) as e:
+                    stats['errors'][400] += 1
+                    return self._error(400, 'Invalid request: {}'.format(e))
+                result.setdefault('status', 'success')
+                result['took'] = round(time.perf_counter() - started, 6)
+                body = ujson.dumps(result).encode('utf-8')
+                stats['bytes-sent'] += len(body)
+                return web.Response(body=body,
+                                    content_type='application/json')
+            finally:
+                stats['in-flight'] -= 1
+        return handle
+
+    async def _fault_response(self, fault):
+        if fault == TIMEOUT:
+            await asyncio.sleep(self.timeout_delay)
+            return None
+        if 400 <= fault < 600:
+            return web.Response(status=fault, text='Injected error')
+        return self._error(ERROR_STATUSES.get(fault, 400),
+                           ERROR_MESSAGES.get(fault, 'Injected error'),
+                           fault)
+
+    @staticmethod
+    def _error(status, message, code=None):
+        return web.Response(
+            status=status, content_type='application/json',
+            body=ujson.dumps({'errors': [{'code': code or status,
+                                          'message': message}]}))
+
+    def _dimension(self, name=None):
+        return self.entities.setdefault(name or DEFAULT_DIMENSION, {})
+
+    def _matching(self, query, dimension=None):
+        """Returns (entity_id, columns, matched values) of every entity
+        matching a query"""
+        return [(entity_id, columns, found)
+                for entity_id, columns in self._dimension(dimension).items()
+                for found in [matches(entity_id, columns, query)]
+                if found]
+
+    # Handlers receive the decoded body and return the response dict
+
+    def get_database(self, data, request):
+        return {'name': 'Stand-in database',
+                'dimensions': sorted(self.entities) or [DEFAULT_DIMENSION]}
+
+    def get_columns(self, data, request):
+        return {'active': list(self.columns.values()), 'inactive': []}
+
+    def create_column(self, data, request):
+        for column in data if isinstance(data, list) else [data]:
+            self.columns[column['api-name']] = column
+        return {}
+
+    def insert(self, data, request):
+        auto_create = data.pop('auto-create', None) or ()
+        inserted_columns = 0
+        for entity_id, columns in data.items():
+            columns = dict(columns)
+            dimension = self._dimension(columns.pop('dimension', None))
+            for column, value in columns.items():
+                if column not in self.columns:
+                    if 'column' not in auto_create:
+                        raise ValueError(
+                            "column {} doesn't exist".format(column))
+                    self.columns[column] = {'api-name': column,
+                                            'name': column}
+                inserted_columns += 1
+            dimension.setdefault(entity_id, {}).update(columns)
+        return {'inserted-entities': len(data),
+                'inserted-columns': inserted_columns}
+
+    def _count(self, data, events):
+        queries = data if isinstance(data, list) else [
+            {'query-name': name, 'query': query}
+            for name, query in data.items() if name != 'bypass-cache']
+        result = {}
+        for query in queries:
+            matched = self._matching(query['query'], query.get('dimension'))
+            result[query['query-name']] = (
+                sum(found for _, _, found in matched) if events
+                else len(matched))
+        return {'result': result}
+
+    def count_entity(self, data, request):
+        return self._count(data, events=False)
+
+    def count_event(self, data, request):
+        return self._count(data, events=True)
+
+    def count_entity_total(self, data, request):
+        dimensions = (data or {}).get('dimensions') or list(self.entities)
+        return {'result': {'total': sum(len(self._dimension(dimension))
+                                        for dimension in dimensions)}}
+
+    @staticmethod
+    def _top(entities, column, quantity, parameters):
+        """Returns the quantity most common values of a column kept by the
+        query parameters"""
+        counts = Counter(str(value) for columns in entities
+                         if column in columns
+                         for value in _values(columns[column])
+                         if _top_value_kept(value, parameters))
+        return [{'quantity': count, 'value': value}
+                for value, count in counts.most_common(quantity)]
+
+    def top_values(self, data, request):
+        entities = list(self._dimension().values())
+        result = {}
+        for name, query in data.items():
+            if name == 'bypass-cache':
+                continue
+            parameters = {key: value for key, value in query.items()
+                          if key in TOP_PARAMETERS}
+            result[name] = {}
+            for column, quantity in query.items():
+                if column in TOP_PARAMETERS:
+                    continue
+                column_parameters = parameters
+                if isinstance(quantity, dict):
+                    column_parameters = dict(parameters, **{
+                        key: value for key, value in quantity.items()
+                        if key in TOP_PARAMETERS})
+                    quantity = quantity.get('quantity')
+                result[name][column] = self._top(
+                    entities, column, quantity, column_parameters)
+        return {'result': result}
+
+    def aggregation(self, data, request):
+        if 'filter' in data:
+            entities = [columns for _, columns, _ in
+                        self._matching(data['filter'])]
+        else:
+            entities = list(self._dimension().values())
+        return {'result': self._aggregate(entities, data['query'])}
+
+    def _aggregate(self, entities, levels):
+        """Returns the top values of the columns of the first level, each
+        value holding the aggregation of the next levels over the entities
+        having it, or the metric of a column given as a string"""
+        level = levels[0]
+        parameters = {key: value for key, value in level.items()
+                      if key in TOP_PARAMETERS}
+        result = {}
+        for column, metric in level.items():
+            if column in TOP_PARAMETERS:
+                continue
+            if isinstance(metric, str):
+                numbers = [float(value) for columns in entities
+                           if column in columns
+                           for value in _values(columns[column])]
+                result[column] = {metric: self._metric(metric, numbers)}
+                continue
+            result[column] = self._top(entities, column, metric, parameters)
+            if len(levels) > 1:
+                for top in result[column]:
+                    having = [columns for columns in entities
+                              if column in columns and top['value'] in
+                              map(str, _values(columns[column]))]
+                    top.update(self._aggregate(having, levels[1:]))
+        return result
+
+    @staticmethod
+    def _metric(metric, numbers):
+        if not numbers:
+            return None
+        if metric == 'min':
+            return min(numbers)
+        if metric == 'max':
+            return max(numbers)
+        if metric == 'sum':
+            return sum(numbers)
+        if metric in ('avg', 'average'):
+            return sum(numbers) / len(numbers)
+        return len(numbers)
+
+    def exists_entity(self, data, request):
+        dimension = self._dimension(data.get('dimension'))
+        return {'exists': [entity_id for entity_id in data['ids']
+                           if entity_id in dimension],
+                'not-exists': [entity_id for entity_id in data['ids']
+                               if entity_id not in dimension]}
+
+    def get_saved_queries(self, data, request):
+        return {'saved-queries': list(self.saved_queries.values())}
+
+    def create_saved_query(self, data, request):
+        self.saved_queries[data['name']] = data
+        return dict(data)
+
+    def get_saved_query(self, data, request):
+        saved = self.saved_queries[request.match_info['name']]
+        result = self._count([{'query-name': saved['name'],
+                               'query': saved['query']}], events=False)
+        return dict(saved, **result)
+
+    def update_saved_query(self, data, request):
+        name = request.match_info['name']
+        saved = self.saved_queries[name]
+        saved.update(data)
+        return dict(saved)
+
+    def delete_saved_query(self, data, request):
+        name = request.match_info['name']
+        return {'deleted-query': self.saved_queries.pop(name)['name']}
+
+    def _data_extraction(self, data, score):
+        matched = self._matching(data.get('query', []), data.get('dimension'))
+        if score:
+            matched.sort(key=lambda item: -item[2])
+        limit = data.get('limit', DEFAULT_PAGE_LIMIT)
+        start = int(data.get('page_token') or 0)
+        page = matched[start:start + limit]
+        wanted = data.get('columns', 'all')
+        records = []
+        for entity_id, columns, found in page:
+            record = {'entity-id': entity_id}
+            record.update((column, value)
+                          for column, value in columns.items()
+                          if wanted == 'all' or column in wanted)
+            if score:
+                record['score'] = found
+            records.append(record)
+        next_start = start + limit
+        return {'data': records, 'page': start // max(limit, 1) + 1,
+                'next-page': (str(next_start) if next_start < len(matched)
+                              else None)}
+
+    def result(self, data, request):
+        return self._data_extraction(data, score=False)
+
+    def score(self, data, request):
+        return self._data_extraction(data, score=True)
+
+    def sql(self, data, request):
+        # SQL isn't interpreted, the statement is only accounted
+        return {'result': [], 'count': 0}
+
+    def delete(self, data, request):
+        dimension = self._dimension(data.get('dimension'))
+        matched = self._matching(data['query'], data.get('dimension'))
+        for entity_id, _, _ in matched:
+            del dimension[entity_id]
+        return {'result': {'deleted': len(matched)}}
+
+    def update(self, data, request):
+        matched = self._matching(data['query'], data.get('dimension'))
+        for _, columns, _ in matched:
+            columns.update(data.get('set', {}))
+        return {'result': {'updated': len(matched)}}
+
+
+async def serve(port, latency, faults):
+    server = StandInServer(latency={'*': latency} if latency else None,
+                           faults={'*': faults} if faults else None)
+    await server.start(port=port)
+    print('Listening, use SD_API_ADDRESS={}'.format(server.url))
+    try:
+        while True:
+            await asyncio.sleep(3600)
+    finally:
+        await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Run a local stand-in for the SlicingDice API.')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0,
+                        help='seconds added to every request')
+    parser.add_argument('--fault', action='append', default=[],
+                        metavar='CODE=PROBABILITY',
+                        help="injected failure of every route, e.g. "
+                             "1502=0.1, 500=0.05 or timeout=0.01")
+    args = parser.parse_args()
+
+    faults = {}
+    for fault in args.fault:
+        code, probability = fault.split('=')
+        faults[code if code == TIMEOUT else int(code)] = float(probability)
+    loop = asyncio.get_event_loop()
+    try:
+        loop.run_until_complete(serve(args.port, args.latency, faults))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()